@@ -0,0 +1,45 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import { StrategyAPI } from "@yearnvaults/contracts/BaseStrategy.sol";
+import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/utils/Address.sol";
+
+/**
+ * Harvest many strategies in one transaction, paying the base transaction cost
+ * and using a keeper nonce once. The harvester must be the keeper of every strategy.
+ */
+contract BatchHarvester is Ownable {
+    using Address for address;
+
+    event StrategyHarvested(address indexed strategy, bool success, uint256 gasUsed);
+
+    mapping(address => bool) public keepers;
+
+    modifier onlyKeepers() {
+        require(keepers[msg.sender] || msg.sender == owner(), "!authorized");
+        _;
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external onlyOwner {
+        keepers[_keeper] = _allowed;
+    }
+
+    /**
+     * A strategy that reverts is skipped, the others are still harvested
+     * @return success : harvest status of every strategy
+     */
+    function harvest(address[] calldata _strategies) external onlyKeepers returns (bool[] memory success) {
+        success = new bool[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            uint256 gasStart = gasleft();
+            // try/catch doesn't catch calls to accounts without code
+            if (_strategies[i].isContract()) {
+                try StrategyAPI(_strategies[i]).harvest() {
+                    success[i] = true;
+                } catch {}
+            }
+            emit StrategyHarvested(_strategies[i], success[i], gasStart - gasleft());
+        }
+    }
+}
@@ -12,24 +12,60 @@ import {
 
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
 
+import "@openzeppelin/contracts/math/Math.sol";
+
 import "@openzeppelin/contracts/access/Ownable.sol";
 
+import "@openzeppelin/contracts/introspection/ERC165.sol";
+
 import "../interfaces/Uniswap/IUniswapRouter.sol";
 
 import "../interfaces/IConverter.sol";
 
 import "../interfaces/Balancer/IBPool.sol";
 
-contract Converter is IConverter, Ownable {
+contract Converter is IBatchConverter, Ownable, ERC165 {
     using SafeERC20 for IERC20;
     using Address for address;
     using SafeMath for uint256;
 
+    uint256 public constant MAX_BPS = 10000;
+
+    // Uniswap spot price is quoted on a 1/SPOT_QUOTE_DIVISOR slice of the amount, so it has ~no price impact
+    uint256 internal constant SPOT_QUOTE_DIVISOR = 1000;
+
+    // Bounds the routes quoted on every conversion
+    uint256 public constant MAX_ROUTERS = 4;
+    // Bounds the quotes (maxSplits * routes) of a split conversion
+    uint256 public constant MAX_SPLITS = 10;
+
+    /**
+     * A conversion route: an optional IDLE => WETH leg on Balancer,
+     * followed by a swap on a V2 router (none when Balancer already ends in assetOut)
+     */
+    struct Route {
+        bool balancer;
+        address router;
+        address[] path;
+        uint256 amountOut;
+    }
+
+    // Default V2 router, always quoted
     address internal uniswap;
+    // Additional V2-style routers (e.g. Sushiswap) quoted alongside uniswap
+    address[] internal routers;
     address immutable public weth;
     address internal bpool;
     address internal idle;
     uint256 internal minAmountIn;
+    // Max output below the spot price accepted on each swap, in bps. The spot price is read in the
+    // same block, so it only bounds the price impact of the swap itself: a pool moved earlier in the
+    // block (e.g. a sandwich) moves the bound with it. Callers protect against that with amountOutMin
+    uint256 internal maxSlippage;
+    // Number of chunks a split conversion is divided in
+    uint256 internal maxSplits;
+    // Conversions of at least this amount of an asset are split across routes, 0 to disable
+    mapping(address => uint256) internal splitThresholds;
 
     constructor(
         address _uniswap,
@@ -43,12 +79,20 @@ contract Converter is IConverter, Ownable {
         bpool = _bpool;
         idle = _idle;
         minAmountIn = _minAmountIn;
+        maxSlippage = 300;
+        maxSplits = 4;
+
+        _registerInterface(type(IBatchConverter).interfaceId);
     }
 
     function getUniswap() external view returns (address) {
         return uniswap;
     }
 
+    function getRouters() external view returns (address[] memory) {
+        return routers;
+    }
+
     function getBPool() external view returns (address) {
         return bpool;
     }
@@ -57,6 +101,18 @@ contract Converter is IConverter, Ownable {
         return minAmountIn;
     }
 
+    function getMaxSlippage() external view returns (uint256) {
+        return maxSlippage;
+    }
+
+    function getMaxSplits() external view returns (uint256) {
+        return maxSplits;
+    }
+
+    function getSplitThreshold(address _asset) external view returns (uint256) {
+        return splitThresholds[_asset];
+    }
+
     function convert(
         uint amountIn,
         uint amountOutMin,
@@ -66,38 +122,372 @@ contract Converter is IConverter, Ownable {
     ) external override returns (uint convertedAmount) {
         IERC20(assetIn).safeTransferFrom(msg.sender, address(this), amountIn);
 
+        convertedAmount = _convert(amountIn, amountOutMin, assetIn, assetOut, to);
+    }
+
+    /**
+     * Convert several assets to `assetOut` with a single final swap:
+     * every asset is first routed to WETH on its best route (or split),
+     * then the total WETH is swapped once to `assetOut`.
+     */
+    function convertMany(
+        address[] calldata assetsIn,
+        uint256[] calldata amountsIn,
+        uint256 amountOutMin,
+        address assetOut,
+        address to
+    ) external override returns (uint256 convertedAmount) {
+        require(assetsIn.length == amountsIn.length, "Converter: length mismatch");
+
+        uint256 wethAmount;
+        uint256 unconverted;
+        for (uint256 i = 0; i < assetsIn.length; i++) {
+            if (amountsIn[i] == 0) {
+                continue;
+            }
+
+            IERC20(assetsIn[i]).safeTransferFrom(msg.sender, address(this), amountsIn[i]);
+
+            if (assetsIn[i] == assetOut) {
+                unconverted = unconverted.add(amountsIn[i]);
+            } else if (assetsIn[i] == weth) {
+                wethAmount = wethAmount.add(amountsIn[i]);
+            } else {
+                wethAmount = wethAmount.add(_convert(amountsIn[i], 0, assetsIn[i], weth, address(this)));
+            }
+        }
+
+        if (assetOut == weth) {
+            unconverted = unconverted.add(wethAmount);
+        } else if (wethAmount > 0) {
+            convertedAmount = _convert(wethAmount, 0, weth, assetOut, to);
+        }
+
+        if (unconverted > 0) {
+            IERC20(assetOut).safeTransfer(to, unconverted);
+            convertedAmount = convertedAmount.add(unconverted);
+        }
+
+        require(convertedAmount >= amountOutMin, "Converter: insufficient output amount");
+    }
+
+    /**
+     * Convert on the best route, or split across several routes when
+     * amountIn is above the split threshold of assetIn
+     */
+    function _convert(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address assetIn,
+        address assetOut,
+        address to
+    ) internal returns (uint256 convertedAmount) {
+        if (!_useSplit(amountIn, assetIn)) {
+            return _executeRoute(_bestRoute(amountIn, assetIn, assetOut), assetIn, amountIn, amountOutMin, to);
+        }
+
+        (Route[] memory routes, uint256[] memory amounts, ) = _splitRoutes(amountIn, assetIn, assetOut);
+        for (uint256 i = 0; i < routes.length; i++) {
+            if (amounts[i] > 0) {
+                convertedAmount = convertedAmount.add(_executeRoute(routes[i], assetIn, amounts[i], 0, to));
+            }
+        }
+
+        require(convertedAmount >= amountOutMin, "Converter: insufficient output amount");
+    }
+
+    function _useSplit(uint256 amountIn, address assetIn) internal view returns (bool) {
+        uint256 threshold = splitThresholds[assetIn];
+        return threshold > 0 && amountIn >= threshold;
+    }
+
+    /**
+     * Candidate routes, one per router (direct pair or through WETH, whichever is better)
+     * and, for IDLE, Balancer as first leg followed by the best route from WETH.
+     * Routes that can't be quoted have a zero amountOut.
+     */
+    function _routes(uint256 amountIn, address assetIn, address assetOut) internal view returns (Route[] memory routes) {
+        address[] memory direct = new address[](2);
+        direct[0] = assetIn;
+        direct[1] = assetOut;
+
+        address[] memory hop;
+        if (assetIn != weth && assetOut != weth) {
+            hop = new address[](3);
+            hop[0] = assetIn;
+            hop[1] = weth;
+            hop[2] = assetOut;
+        }
+
+        routes = new Route[](routers.length.add(2));
+        // i == 0 is the default router
+        for (uint256 i = 0; i <= routers.length; i++) {
+            address router = i == 0 ? uniswap : routers[i - 1];
+            routes[i] = _betterRoute(routes[i], router, direct, amountIn);
+            if (hop.length > 0) {
+                routes[i] = _betterRoute(routes[i], router, hop, amountIn);
+            }
+        }
+
+        routes[routes.length - 1] = _balancerRoute(amountIn, assetIn, assetOut);
+    }
+
+    function _balancerRoute(uint256 amountIn, address assetIn, address assetOut) internal view returns (Route memory route) {
         // Balancer has a minAmount to swap otherwise revert with ERR_MATH_APPROX
-        if (assetIn == idle && amountIn >= minAmountIn) {
-            _ensureAllowance(assetIn, bpool, amountIn);
-
-            // Convert always IDLE to WETH
-            (convertedAmount, ) = IBPool(bpool).swapExactAmountIn(
-                assetIn,
-                amountIn,
-                weth,
-                amountOutMin,
-                type(uint256).max
-            );
+        if (assetIn != idle || amountIn < minAmountIn || bpool == address(0)) {
+            return route;
+        }
+
+        uint256 wethAmount = _balancerAmountOut(assetIn, amountIn);
+        if (wethAmount == 0) {
+            return route;
+        }
+
+        if (assetOut == weth) {
+            route.amountOut = wethAmount;
+        } else {
+            route = _maxRoute(_routes(wethAmount, weth, assetOut));
+        }
+        route.balancer = true;
+    }
+
+    function _bestRoute(uint256 amountIn, address assetIn, address assetOut) internal view returns (Route memory best) {
+        best = _maxRoute(_routes(amountIn, assetIn, assetOut));
+        require(best.amountOut > 0, "Converter: no route");
+    }
+
+    function _maxRoute(Route[] memory routes) internal pure returns (Route memory best) {
+        for (uint256 i = 0; i < routes.length; i++) {
+            if (routes[i].amountOut > best.amountOut) {
+                best = routes[i];
+            }
+        }
+    }
+
+    /**
+     * Split amountIn in maxSplits chunks, each one going to the route
+     * with the highest marginal output given what is already allocated to it.
+     * Routes are picked on a chunk: a shallow pool (e.g. Balancer past its max in ratio)
+     * can't take the whole amount but still takes some chunks
+     */
+    function _splitRoutes(uint256 amountIn, address assetIn, address assetOut)
+        internal
+        view
+        returns (Route[] memory routes, uint256[] memory amounts, uint256[] memory amountsOut)
+    {
+        uint256 splits = maxSplits;
+        uint256 chunk = amountIn.div(splits);
+        routes = _routes(chunk > 0 ? chunk : amountIn, assetIn, assetOut);
+        _dropSharedLegs(routes);
+        amounts = new uint256[](routes.length);
+        amountsOut = new uint256[](routes.length);
+
+        for (uint256 i = 0; i < splits; i++) {
+            // The last chunk takes the rounding remainder
+            _allocate(routes, amounts, amountsOut, assetIn, i == splits - 1 ? amountIn.sub(chunk.mul(i)) : chunk);
+        }
+    }
+
+    /**
+     * The V2 leg of the Balancer route (WETH => assetOut) and a route through WETH on the same
+     * router swap in the same pair. Each route is quoted on the pair's current reserves, so
+     * splitting between them would count its liquidity twice: only the better one is kept
+     */
+    function _dropSharedLegs(Route[] memory routes) internal pure {
+        Route memory balancerRoute = routes[routes.length - 1];
+        if (!balancerRoute.balancer || balancerRoute.router == address(0)) {
+            return;
+        }
+
+        for (uint256 i = 0; i < routes.length - 1; i++) {
+            if (routes[i].router != balancerRoute.router || routes[i].path.length != 3) {
+                continue;
+            }
+
+            if (routes[i].amountOut > balancerRoute.amountOut) {
+                balancerRoute.amountOut = 0;
+            } else {
+                routes[i].amountOut = 0;
+            }
+            return;
+        }
+    }
+
+    function _allocate(
+        Route[] memory routes,
+        uint256[] memory amounts,
+        uint256[] memory amountsOut,
+        address assetIn,
+        uint256 amountIn
+    ) internal view {
+        if (amountIn == 0) {
+            return;
+        }
+
+        uint256 best = routes.length;
+        uint256 bestGain;
+        uint256 bestAmountOut;
+        for (uint256 i = 0; i < routes.length; i++) {
+            // No quote for a single chunk, or a dropped shared leg
+            if (routes[i].amountOut == 0) {
+                continue;
+            }
+
+            uint256 amountOut = _quoteRoute(routes[i], assetIn, amounts[i].add(amountIn));
+            if (amountOut > amountsOut[i] && amountOut - amountsOut[i] > bestGain) {
+                best = i;
+                bestGain = amountOut - amountsOut[i];
+                bestAmountOut = amountOut;
+            }
+        }
+        require(best < routes.length, "Converter: no route");
+
+        amounts[best] = amounts[best].add(amountIn);
+        amountsOut[best] = bestAmountOut;
+    }
+
+    function _quoteRoute(Route memory route, address assetIn, uint256 amountIn) internal view returns (uint256) {
+        if (route.balancer) {
+            // Balancer has a minAmount to swap otherwise revert with ERR_MATH_APPROX
+            if (amountIn < minAmountIn) {
+                return 0;
+            }
+
+            amountIn = _balancerAmountOut(assetIn, amountIn);
+            if (route.router == address(0) || amountIn == 0) {
+                return amountIn;
+            }
+        }
+
+        return _v2AmountOut(route.router, route.path, amountIn);
+    }
+
+    function _betterRoute(
+        Route memory best,
+        address router,
+        address[] memory path,
+        uint256 amountIn
+    ) internal view returns (Route memory) {
+        uint256 amountOut = _v2AmountOut(router, path, amountIn);
+        if (amountOut > best.amountOut) {
+            return Route(false, router, path, amountOut);
+        }
+
+        return best;
+    }
+
+    function _v2AmountOut(address router, address[] memory path, uint256 amountIn) internal view returns (uint256) {
+        // Missing pairs revert, the route is simply skipped
+        try IUniswapRouter(router).getAmountsOut(amountIn, path) returns (uint256[] memory amounts) {
+            return amounts[amounts.length.sub(1)];
+        } catch {
+            return 0;
+        }
+    }
+
+    function _balancerAmountOut(address assetIn, uint256 amountIn) internal view returns (uint256) {
+        IBPool pool = IBPool(bpool);
+        uint256 balanceIn = pool.getBalance(assetIn);
+        // Balancer reverts with ERR_MAX_IN_RATIO above half of the pool balance
+        if (amountIn > balanceIn.div(2)) {
+            return 0;
+        }
+
+        try pool.calcOutGivenIn(
+            balanceIn,
+            pool.getDenormalizedWeight(assetIn),
+            pool.getBalance(weth),
+            pool.getDenormalizedWeight(weth),
+            amountIn,
+            pool.getSwapFee()
+        ) returns (uint256 amountOut) {
+            return amountOut;
+        } catch {
+            return 0;
+        }
+    }
+
+    function _executeRoute(
+        Route memory route,
+        address assetIn,
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address to
+    ) internal returns (uint256 amountOut) {
+        if (route.balancer) {
+            // Convert always IDLE to WETH, amountOutMin only applies to WETH when it's the asset out
+            amountOut = _swapBalancer(assetIn, amountIn, route.router == address(0) ? amountOutMin : 0);
 
             // Return immediately in the case assetOut WETH
-            // Otw swap with the default method
-            if (assetOut == weth) {
-                IERC20(weth).safeTransfer(to, convertedAmount);
-                return convertedAmount;
+            if (route.router == address(0)) {
+                if (to != address(this)) {
+                    IERC20(weth).safeTransfer(to, amountOut);
+                }
+                return amountOut;
             }
 
-            // assetIn becomes weth and amountIn the returned WETH
-            assetIn = weth;
-            amountIn = convertedAmount;
+            // The V2 leg starts from the returned WETH
+            amountIn = amountOut;
         }
 
-        _ensureAllowance(assetIn, uniswap, amountIn);
+        amountOut = _swapV2(route.router, route.path, amountIn, amountOutMin, to);
+    }
+
+    /**
+     * Every swap is bounded by the spot price of the same route minus maxSlippage, so a swap reverts
+     * when its own price impact exceeds the bound. It doesn't protect against a price moved earlier in
+     * the block, only the caller's amountOutMin from an outside reference does
+     */
+    function _swapV2(
+        address router,
+        address[] memory path,
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address to
+    ) internal returns (uint256) {
+        amountOutMin = Math.max(amountOutMin, _applySlippage(_v2SpotAmountOut(router, amountIn, path)));
 
-        uint[] memory amounts = IUniswapRouter(uniswap).swapExactTokensForTokens(
-            amountIn, amountOutMin, _getPath(assetIn, assetOut), to, now.add(1800)
+        _ensureAllowance(path[0], router, amountIn);
+
+        uint[] memory amounts = IUniswapRouter(router).swapExactTokensForTokens(
+            amountIn, amountOutMin, path, to, now.add(1800)
+        );
+
+        return amounts[amounts.length.sub(1)];
+    }
+
+    function _swapBalancer(address assetIn, uint256 amountIn, uint256 amountOutMin) internal returns (uint256 wethAmount) {
+        amountOutMin = Math.max(amountOutMin, _applySlippage(_balancerSpotAmountOut(assetIn, amountIn)));
+
+        _ensureAllowance(assetIn, bpool, amountIn);
+
+        (wethAmount, ) = IBPool(bpool).swapExactAmountIn(
+            assetIn,
+            amountIn,
+            weth,
+            amountOutMin,
+            type(uint256).max
         );
+    }
+
+    function _v2SpotAmountOut(address router, uint256 amountIn, address[] memory path) internal view returns (uint256) {
+        uint256 quoteAmountIn = amountIn.div(SPOT_QUOTE_DIVISOR);
+        // Dust, too small to be quoted
+        if (quoteAmountIn == 0) {
+            return 0;
+        }
 
-        convertedAmount = amounts[amounts.length.sub(1)];
+        uint256[] memory amounts = IUniswapRouter(router).getAmountsOut(quoteAmountIn, path);
+        return amounts[path.length.sub(1)].mul(SPOT_QUOTE_DIVISOR);
+    }
+
+    function _balancerSpotAmountOut(address assetIn, uint256 amountIn) internal view returns (uint256) {
+        // Spot price is assetIn per WETH, swap fee included
+        return amountIn.mul(1e18).div(IBPool(bpool).getSpotPrice(assetIn, weth));
+    }
+
+    function _applySlippage(uint256 spotAmountOut) internal view returns (uint256) {
+        return spotAmountOut.mul(MAX_BPS.sub(maxSlippage)).div(MAX_BPS);
     }
 
     function _ensureAllowance(address token, address spender, uint256 amount) internal {
@@ -120,15 +510,47 @@ contract Converter is IConverter, Ownable {
         }
     }
 
+    // Output of the route(s) convert would use
     function getAmountOut(uint256 amountIn, address assetIn, address assetOut) external override view returns (uint256 amountOut) {
-        address[] memory path = _getPath(assetIn, assetOut);
-        uint256[] memory amounts = IUniswapRouter(uniswap).getAmountsOut(amountIn, path);
-        return amounts[path.length.sub(1)];
+        if (!_useSplit(amountIn, assetIn)) {
+            return _bestRoute(amountIn, assetIn, assetOut).amountOut;
+        }
+
+        (, , uint256[] memory amountsOut) = _splitRoutes(amountIn, assetIn, assetOut);
+        for (uint256 i = 0; i < amountsOut.length; i++) {
+            amountOut = amountOut.add(amountsOut[i]);
+        }
+    }
+
+    // Amount sent to each candidate route by a split conversion, zero for unused routes
+    function getSplit(uint256 amountIn, address assetIn, address assetOut)
+        external
+        view
+        returns (address[] memory routers_, bool[] memory balancer, uint256[] memory amounts)
+    {
+        Route[] memory routes;
+        (routes, amounts, ) = _splitRoutes(amountIn, assetIn, assetOut);
+
+        routers_ = new address[](routes.length);
+        balancer = new bool[](routes.length);
+        for (uint256 i = 0; i < routes.length; i++) {
+            routers_[i] = routes[i].router;
+            balancer[i] = routes[i].balancer;
+        }
+    }
+
+    function getBestRoute(uint256 amountIn, address assetIn, address assetOut)
+        external
+        view
+        returns (bool balancer, address router, address[] memory path, uint256 amountOut)
+    {
+        Route memory route = _bestRoute(amountIn, assetIn, assetOut);
+        return (route.balancer, route.router, route.path, route.amountOut);
     }
 
     function getAmountIn(uint256 amountOut, address assetIn, address assetOut) external override view returns (uint256 amountIn) {
         address[] memory path = _getPath(assetIn, assetOut);
-        uint256[] memory amounts = IUniswapRouter(uniswap).getAmountsIn(amountIn, path);
+        uint256[] memory amounts = IUniswapRouter(uniswap).getAmountsIn(amountOut, path);
         return amounts[0];
     }
 
@@ -140,6 +562,26 @@ contract Converter is IConverter, Ownable {
         uniswap = _uniswap;
     }
 
+    function addRouter(address _router) external onlyOwner {
+        require(routers.length < MAX_ROUTERS, "Converter: too many routers");
+        for (uint256 i = 0; i < routers.length; i++) {
+            require(routers[i] != _router, "Converter: router already added");
+        }
+        routers.push(_router);
+    }
+
+    function removeRouter(address _router) external onlyOwner {
+        uint256 length = routers.length;
+        for (uint256 i = 0; i < length; i++) {
+            if (routers[i] == _router) {
+                routers[i] = routers[length - 1];
+                routers.pop();
+                return;
+            }
+        }
+        revert("Converter: router not found");
+    }
+
     function setBPool(address _bpool) external onlyOwner {
         bpool = _bpool;
     }
@@ -147,4 +589,18 @@ contract Converter is IConverter, Ownable {
     function setMinAmountIn(uint256 _minAmountIn) external onlyOwner {
         minAmountIn = _minAmountIn;
     }
+
+    function setMaxSlippage(uint256 _maxSlippage) external onlyOwner {
+        require(_maxSlippage <= MAX_BPS, "Converter: slippage too high");
+        maxSlippage = _maxSlippage;
+    }
+
+    function setMaxSplits(uint256 _maxSplits) external onlyOwner {
+        require(_maxSplits > 0 && _maxSplits <= MAX_SPLITS, "Converter: invalid max splits");
+        maxSplits = _maxSplits;
+    }
+
+    function setSplitThreshold(address _asset, uint256 _threshold) external onlyOwner {
+        splitThresholds[_asset] = _threshold;
+    }
 }
\ No newline at end of file
@@ -1,21 +1,100 @@
 // SPDX-License-Identifier: AGPL-3.0
 pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
 
 contract ProxyFactoryInitializable {
   
     event ProxyCreated(address indexed proxy, bytes returnData);
 
     function deployMinimal(address _logic, bytes memory _data) external returns (address proxy, bytes memory returnData) {
+        proxy = _deploy(_minimalInitCode(_logic), 0, false);
+        returnData = _initProxy(proxy, _data);
+    }
+
+    /// @dev Deploy one clone of `_logic` per init data, e.g. one strategy per Idle token
+    function deployMinimalBatch(address _logic, bytes[] calldata _data) external returns (address[] memory proxies) {
+        bytes memory initCode = _minimalInitCode(_logic);
+        proxies = new address[](_data.length);
+        for (uint256 i = 0; i < _data.length; i++) {
+            proxies[i] = _deploy(initCode, 0, false);
+            _initProxy(proxies[i], _data[i]);
+        }
+    }
+
+    /// @dev Deploy a clone with create2, its address is known in advance with `predictMinimalDeterministic`.
+    /// The salt is bound to msg.sender so nobody else can take the address
+    function deployMinimalDeterministic(
+        address _logic,
+        bytes memory _data,
+        bytes32 _salt
+    ) external returns (address proxy, bytes memory returnData) {
+        proxy = _deploy(_minimalInitCode(_logic), keccak256(abi.encodePacked(msg.sender, _salt)), true);
+        returnData = _initProxy(proxy, _data);
+    }
+
+    function predictMinimalDeterministic(
+        address _logic,
+        bytes32 _salt,
+        address _deployer
+    ) external view returns (address) {
+        bytes32 hash = keccak256(
+            abi.encodePacked(
+                bytes1(0xff),
+                address(this),
+                keccak256(abi.encodePacked(_deployer, _salt)),
+                keccak256(_minimalInitCode(_logic))
+            )
+        );
+        return address(uint160(uint256(hash)));
+    }
+
+    /// @dev Deploy a clone with `_args` appended to its code, after the EIP-1167 runtime.
+    /// The logic reads them with extcodecopy(address(this)) instead of keeping them in storage
+    function deployMinimalWithArgs(
+        address _logic,
+        bytes memory _args,
+        bytes memory _data
+    ) external returns (address proxy, bytes memory returnData) {
+        uint256 runtimeSize = 45 + _args.length;
+        require(runtimeSize <= type(uint16).max, "ProxyFactory: args too long");
+
+        bytes memory initCode = abi.encodePacked(
+            // RETURNDATASIZE PUSH2 runtimeSize DUP1 PUSH1 0x0b RETURNDATASIZE CODECOPY DUP2 RETURN
+            hex"3d61",
+            uint16(runtimeSize),
+            hex"80600b3d3981f3",
+            _minimalRuntime(_logic),
+            _args
+        );
+
+        proxy = _deploy(initCode, 0, false);
+        returnData = _initProxy(proxy, _data);
+    }
+
+    function _minimalInitCode(address _logic) internal pure returns (bytes memory) {
         // Adapted from https://github.com/optionality/clone-factory/blob/32782f82dfc5a00d103a7e61a17a5dedbd1e8e9d/contracts/CloneFactory.sol
-        bytes20 targetBytes = bytes20(_logic);
+        return abi.encodePacked(hex"3d602d80600a3d3981f3", _minimalRuntime(_logic));
+    }
+
+    /// @dev EIP-1167 runtime, 45 bytes
+    function _minimalRuntime(address _logic) internal pure returns (bytes memory) {
+        return abi.encodePacked(hex"363d3d373d3d3d363d73", _logic, hex"5af43d82803e903d91602b57fd5bf3");
+    }
+
+    function _deploy(bytes memory _initCode, bytes32 _salt, bool _deterministic) internal returns (address proxy) {
         assembly {
-        let clone := mload(0x40)
-        mstore(clone, 0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000)
-        mstore(add(clone, 0x14), targetBytes)
-        mstore(add(clone, 0x28), 0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000)
-        proxy := create(0, clone, 0x37)
+            switch _deterministic
+            case 0 {
+                proxy := create(0, add(_initCode, 0x20), mload(_initCode))
+            }
+            default {
+                proxy := create2(0, add(_initCode, 0x20), mload(_initCode), _salt)
+            }
         }
-        
+        require(proxy != address(0), "ProxyFactory: deploy failed");
+    }
+
+    function _initProxy(address proxy, bytes memory _data) internal returns (bytes memory returnData) {
         if(_data.length > 0) {
         bool success = false;
         (success, returnData) = proxy.call(_data);
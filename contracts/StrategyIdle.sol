@@ -6,12 +6,13 @@ pragma solidity 0.6.12;
 pragma experimental ABIEncoderV2;
 
 // These are the core Yearn libraries
-import { BaseStrategyInitializable } from "@yearnvaults/contracts/BaseStrategy.sol";
+import { BaseStrategyInitializable, StrategyParams } from "@yearnvaults/contracts/BaseStrategy.sol";
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
 import "@openzeppelin/contracts/math/Math.sol";
 import "@openzeppelin/contracts/math/SafeMath.sol";
 import "@openzeppelin/contracts/utils/Address.sol";
 import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "@openzeppelin/contracts/introspection/IERC165.sol";
 
 import "../interfaces/Idle/IIdleTokenV4.sol";
 import "../interfaces/Idle/IdleReservoir.sol";
@@ -27,34 +28,71 @@ contract StrategyIdle is BaseStrategyInitializable {
 
     uint256 public constant FULL_ALLOC = 100000;
 
-    address internal weth;
+    uint256 public constant MAX_BPS = 10000;
+
+    uint256 public constant MAX_EXTRA_IDLE_TOKENS = 3;
+
+    // Fixed after init. Empty on clones of StrategyIdleImmutableArgs, which keep them in their code
+    address internal wethStored;
     address internal converter;
-    address public idleReservoir;
-    address public idleYieldToken;
-    address public referral;
+    // Converter supports IBatchConverter.convertMany
+    bool public batchConverter;
+    address internal idleReservoirStored;
+    address internal referralStored;
 
+    // Read on every hot path, flags are packed in the same slot
+    address internal idleYieldTokenStored;
     bool public checkVirtualPrice;
-    uint256 public lastVirtualPrice;
-
     bool public checkRedeemedAmount;
+    // Set by the first unwind(), want redeemed by chunks isn't minted back
+    bool public unwinding;
+    // IdleToken new want is minted into: 0 is idleYieldToken, i is extraIdleTokens[i - 1]
+    uint8 public activeIdleTokenIndex;
 
-    bool public alreadyRedeemed;
+    uint256 public lastVirtualPrice;
 
     address[] internal govTokens;
 
     uint256 public redeemThreshold;
 
-    modifier updateVirtualPrice() {
-        uint256 currentTokenPrice = _getTokenPrice();
-        if (checkVirtualPrice) {
-            require(
-                lastVirtualPrice <= currentTokenPrice,
-                "Virtual price is decreasing from the last time, potential losses"
-            );
-        }
-        lastVirtualPrice = currentTokenPrice;
-        _;
-    }
+    // Want per 1e18 WETH, refreshed on harvest and tend so harvestTrigger doesn't quote the converter
+    uint128 public wethToWantRate;
+    uint64 public wethToWantRateUpdatedAt;
+    // Max age of wethToWantRate before ethToWant falls back to a live quote, 0 to always quote
+    uint256 public rateStaleness;
+
+    // Share of the total debt kept in want (bps) so small withdrawals don't redeem from Idle
+    uint256 public bufferRatio;
+
+    // Smaller amounts of want accumulate in the strategy instead of being minted, see forceDeploy
+    uint256 public minDeployAmount;
+
+    // tend compounds gov tokens once they are worth tendProfitFactor times the call cost, 0 disables tend.
+    // When enabled, harvestTrigger leaves gov tokens to tend and only looks at reported profit
+    uint256 public tendProfitFactor;
+
+    // Max IdleTokens redeemed in one transaction, 0 redeems everything at once.
+    // Larger positions are drained by unwind() before a migration or an emergency exit
+    uint256 public unwindChunk;
+
+    // Other IdleTokens of the same want, capital moves to the one with the best APR on harvest
+    address[] internal extraIdleTokens;
+    // Last price of every extra IdleToken, lastVirtualPrice is the one of idleYieldToken
+    mapping(address => uint256) public extraVirtualPrices;
+    // Period over which the APR gain of a move must pay for its redeems and mint
+    uint256 public rebalanceHorizon;
+    // Gas of one redeem or mint, used to price a move
+    uint256 public rebalanceGas;
+
+    // Min want per 1e18 gov token accepted on conversions, set by the keeper from an off-chain price.
+    // The converter slippage bound is quoted in the same block, so it can't stop a sandwich, this can.
+    // Gov tokens without a rate are never sold
+    mapping(address => uint256) public minGovTokenRates;
+
+    event Unwound(address idleToken, uint256 redeemed, uint256 remaining);
+
+    // The gov token is kept and retried on the next harvest
+    event GovTokenConversionFailed(address govToken, uint256 amount);
 
     modifier onlyGovernanceOrManagement() {
         require(msg.sender == governance() || msg.sender == vault.management(), "!authorized");
@@ -101,23 +139,25 @@ contract StrategyIdle is BaseStrategyInitializable {
             "Vault want is different from Idle token underlying"
         );
 
-        idleReservoir = _idleReservoir;
-        idleYieldToken = _idleYieldToken;
-        referral = _referral;
+        _setImmutables(_weth, _idleReservoir, _idleYieldToken, _referral);
 
-        weth = _weth;
         converter = _converter;
+        batchConverter = _supportsBatchConversion(_converter);
         _setGovTokens(_govTokens);
 
         checkVirtualPrice = true;
         lastVirtualPrice = IIdleTokenV4(_idleYieldToken).tokenPrice();
 
-        alreadyRedeemed = false;
-
         checkRedeemedAmount = true;
 
         redeemThreshold = 1;
 
+        rateStaleness = 6 hours;
+        _updateWethToWantRate();
+
+        rebalanceHorizon = 7 days;
+        rebalanceGas = 500000;
+
         want.safeApprove(_idleYieldToken, type(uint256).max);
     }
 
@@ -147,25 +187,171 @@ contract StrategyIdle is BaseStrategyInitializable {
         redeemThreshold = _redeemThreshold;
     }
 
+    function setRateStaleness(uint256 _rateStaleness) external onlyGovernanceOrManagement {
+        rateStaleness = _rateStaleness;
+    }
+
+    function setBufferRatio(uint256 _bufferRatio) external onlyGovernanceOrManagement {
+        require(_bufferRatio <= MAX_BPS, "bufferRatio too high");
+        bufferRatio = _bufferRatio;
+    }
+
+    function setTendProfitFactor(uint256 _tendProfitFactor) external onlyAuthorized {
+        tendProfitFactor = _tendProfitFactor;
+    }
+
+    function setMinDeployAmount(uint256 _minDeployAmount) external onlyGovernance {
+        minDeployAmount = _minDeployAmount;
+    }
+
+    function setRebalanceParams(uint256 _rebalanceHorizon, uint256 _rebalanceGas) external onlyGovernanceOrManagement {
+        rebalanceHorizon = _rebalanceHorizon;
+        rebalanceGas = _rebalanceGas;
+    }
+
+    function setMinGovTokenRates(address[] calldata _govTokens, uint256[] calldata _rates) external onlyKeepers {
+        require(_govTokens.length == _rates.length, "Lengths mismatch");
+        for (uint256 i = 0; i < _govTokens.length; i++) {
+            minGovTokenRates[_govTokens[i]] = _rates[i];
+        }
+    }
+
+    function setExtraIdleTokens(address[] memory _extraIdleTokens) external onlyGovernance {
+        require(_extraIdleTokens.length <= MAX_EXTRA_IDLE_TOKENS, "IdleTokens too long");
+
+        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken());
+        address active = address(_activeIdleToken(_idleToken));
+        address[] memory _oldIdleTokens = extraIdleTokens;
+
+        // Removed IdleTokens are redeemed, their want is minted into the active one on the next harvest
+        for (uint256 i = 0; i < _oldIdleTokens.length; i++) {
+            if (_contains(_extraIdleTokens, _oldIdleTokens[i], _extraIdleTokens.length)) {
+                continue;
+            }
+            IIdleTokenV4 oldIdleToken = IIdleTokenV4(_oldIdleTokens[i]);
+            _updateExtraVirtualPrice(address(oldIdleToken), oldIdleToken.tokenPriceWithFee(address(this)));
+            oldIdleToken.redeemIdleToken(oldIdleToken.balanceOf(address(this)));
+            want.safeApprove(address(oldIdleToken), 0);
+            delete extraVirtualPrices[address(oldIdleToken)];
+        }
+
+        uint8 index;
+        for (uint256 i = 0; i < _extraIdleTokens.length; i++) {
+            address extraIdleToken = _extraIdleTokens[i];
+            require(
+                extraIdleToken != address(_idleToken) &&
+                    !_contains(_extraIdleTokens, extraIdleToken, i) &&
+                    IIdleTokenV4(extraIdleToken).token() == address(want),
+                "Invalid IdleToken"
+            );
+            if (extraIdleToken == active) {
+                index = uint8(i + 1);
+            }
+            if (!_contains(_oldIdleTokens, extraIdleToken, _oldIdleTokens.length)) {
+                extraVirtualPrices[extraIdleToken] = IIdleTokenV4(extraIdleToken).tokenPrice();
+                want.safeApprove(extraIdleToken, type(uint256).max);
+            }
+        }
+
+        extraIdleTokens = _extraIdleTokens;
+        activeIdleTokenIndex = index;
+    }
+
+    function setUnwindChunk(uint256 _unwindChunk) external onlyGovernanceOrManagement {
+        unwindChunk = _unwindChunk;
+    }
+
+    // Stop minting and redeem the next unwindChunk IdleTokens, called until the position is drained
+    function unwind() external onlyKeepers {
+        uint256 chunk = unwindChunk;
+        require(chunk > 0, "unwindChunk not set");
+
+        unwinding = true;
+
+        // idleYieldToken first, then the extra IdleTokens
+        uint256 index;
+        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken());
+        uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+        uint256 length = extraIdleTokens.length;
+        while (idleTokenBalance == 0 && index < length) {
+            _idleToken = IIdleTokenV4(extraIdleTokens[index++]);
+            idleTokenBalance = _idleToken.balanceOf(address(this));
+        }
+
+        uint256 redeemed = Math.min(chunk, idleTokenBalance);
+        if (redeemed > 0) {
+            uint256 tokenPrice = _idleToken.tokenPriceWithFee(address(this));
+            if (index == 0) {
+                _updateVirtualPrice(tokenPrice);
+            } else {
+                _updateExtraVirtualPrice(address(_idleToken), tokenPrice);
+            }
+            _idleToken.redeemIdleToken(redeemed);
+        }
+
+        emit Unwound(address(_idleToken), redeemed, idleTokenBalance - redeemed);
+    }
+
+    // Resume minting after an unwind that is not followed by a migration or an emergency exit
+    function stopUnwind() external onlyAuthorized {
+        unwinding = false;
+    }
+
+    // Mint the want accumulated below minDeployAmount
+    function forceDeploy() external onlyKeepers {
+        require(!emergencyExit, "Emergency exit");
+        require(!unwinding, "Unwinding");
+
+        uint256 toKeep = _toKeep(vault.debtOutstanding());
+        uint256 balanceOfWant = balanceOfWant();
+        if (balanceOfWant > toKeep) {
+            _activeIdleToken(IIdleTokenV4(idleYieldToken())).mintIdleToken(balanceOfWant.sub(toKeep), true, referral());
+        }
+    }
+
     // ******** OVERRIDE THESE METHODS FROM BASE CONTRACT ************
 
     function name() external view override returns (string memory) {
-        return string(abi.encodePacked("StrategyIdle", IIdleTokenV4(idleYieldToken).symbol()));
+        return string(abi.encodePacked("StrategyIdle", IIdleTokenV4(idleYieldToken()).symbol()));
     }
 
     /**
      * @return totalAssets : the value of all positions in terms of `want`
      */
     function estimatedTotalAssets() public view override returns (uint256 totalAssets) {
-        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken);
+        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken());
         uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
-        totalAssets = want.balanceOf(address(this));
+        totalAssets = balanceOfWant().add(_extraAssets());
 
         if (idleTokenBalance != 0) {
-            totalAssets += idleTokenBalance.mul(_idleToken.tokenPriceWithFee(address(this)));
+            totalAssets = _estimatedTotalAssets(
+                totalAssets,
+                idleTokenBalance,
+                _idleToken.tokenPriceWithFee(address(this))
+            );
+        }
+    }
+
+    // Value of the extra IdleTokens, in want
+    function _extraAssets() internal view returns (uint256 assets) {
+        address[] memory _extraIdleTokens = extraIdleTokens;
+        for (uint256 i = 0; i < _extraIdleTokens.length; i++) {
+            IIdleTokenV4 _idleToken = IIdleTokenV4(_extraIdleTokens[i]);
+            uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+            if (idleTokenBalance != 0) {
+                assets = assets.add(idleTokenBalance.mul(_idleToken.tokenPriceWithFee(address(this))).div(1e18));
+            }
         }
     }
 
+    function _estimatedTotalAssets(
+        uint256 _wantBalance,
+        uint256 _idleTokenBalance,
+        uint256 _tokenPrice
+    ) internal pure returns (uint256) {
+        return _wantBalance.add(_idleTokenBalance.mul(_tokenPrice).div(1e18));
+    }
+
     /*
      * Perform any strategy unwinding or other calls necessary to capture the "free return"
      * this strategy has generated since the last time it's core position(s) were adjusted.
@@ -189,24 +375,27 @@ contract StrategyIdle is BaseStrategyInitializable {
             uint256 _debtPayment
         )
     {
-        // Reset, it could have been set during a withdrawal
-        if (alreadyRedeemed) {
-            alreadyRedeemed = false;
-        }
-
         // Assure IdleController has IDLE tokens during redeem
-        IdleReservoir(idleReservoir).drip();
+        IdleReservoir(idleReservoir()).drip();
 
-        // Get debt, currentValue (want+idle), only want
-        uint256 debt = vault.strategies(address(this)).totalDebt;
-        uint256 currentValue = estimatedTotalAssets();
+        // Read balances and price once, they are reused below
+        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken());
         uint256 wantBalance = balanceOfWant();
+        uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+        uint256 tokenPrice = _idleToken.tokenPriceWithFee(address(this));
 
-        // Calculate total profit w/o farming
-        if (debt < currentValue) {
-            _profit = currentValue.sub(debt);
-        } else {
-            _loss = debt.sub(currentValue);
+        {
+            // Get debt, currentValue (want+idle)
+            uint256 debt = vault.strategies(address(this)).totalDebt;
+            uint256 currentValue =
+                _estimatedTotalAssets(wantBalance.add(_extraAssets()), idleTokenBalance, tokenPrice);
+
+            // Calculate total profit w/o farming
+            if (debt < currentValue) {
+                _profit = currentValue.sub(debt);
+            } else {
+                _loss = debt.sub(currentValue);
+            }
         }
 
         // To withdraw = profit from lending + _debtOutstanding
@@ -216,7 +405,9 @@ contract StrategyIdle is BaseStrategyInitializable {
         if (toFree > wantBalance) {
             // Divest only the missing part = toFree-wantBalance
             toFree = toFree.sub(wantBalance);
-            uint256 freedAmount = freeAmount(toFree);
+            _updateVirtualPrice(tokenPrice);
+            uint256 freedAmount = freeAmount(_idleToken, toFree, tokenPrice, idleTokenBalance, wantBalance);
+            wantBalance = wantBalance.add(freedAmount);
 
             // loss in the case freedAmount less to be freed
             uint256 withdrawalLoss = freedAmount < toFree ? toFree.sub(freedAmount) : 0;
@@ -228,14 +419,11 @@ contract StrategyIdle is BaseStrategyInitializable {
                 _loss = _loss.add(withdrawalLoss.sub(_profit));
                 _profit = 0;
             }
-        }
-
-        // Claim only if not done in the previous liquidate step during redeem
-        if (!alreadyRedeemed) {
-            IIdleTokenV4(idleYieldToken).redeemIdleToken(0);
         } else {
-            alreadyRedeemed = false;
+            // Claim only if freeAmount didn't, any redeem claims the gov tokens
+            _idleToken.redeemIdleToken(0);
         }
+        _claimExtraGovTokens();
 
         // If we have govTokens, let's convert them!
         // This is done in a separate step since there might have been
@@ -245,8 +433,10 @@ contract StrategyIdle is BaseStrategyInitializable {
         // Increase profit by liquidated amount
         _profit = _profit.add(liquidated);
 
-        // Recalculate profit
-        wantBalance = balanceOfWant();
+        // Recalculate profit, want only changed if gov tokens got converted
+        if (liquidated > 0) {
+            wantBalance = balanceOfWant();
+        }
 
         if (wantBalance < _profit) {
             _profit = wantBalance;
@@ -265,32 +455,158 @@ contract StrategyIdle is BaseStrategyInitializable {
      * was made is available for reinvestment. Also note that this number could
      * be 0, and you should handle that scenario accordingly.
      */
-    function adjustPosition(uint256 _debtOutstanding) internal override updateVirtualPrice {
+    function adjustPosition(uint256 _debtOutstanding) internal override {
         // NOTE: Try to adjust positions so that `_debtOutstanding` can be freed up on *next* harvest (not immediately)
 
-        //emergency exit is dealt with in prepareReturn
-        if (emergencyExit) {
+        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken());
+        uint256 tokenPrice = _idleToken.tokenPriceWithFee(address(this));
+        _updateVirtualPrice(tokenPrice);
+
+        // Called by both harvest and tend
+        _updateWethToWantRate();
+
+        //emergency exit is dealt with in prepareReturn, unwinding keeps the redeemed want
+        if (emergencyExit || unwinding) {
             return;
         }
 
+        if (msg.sig == this.harvest.selector && extraIdleTokens.length > 0) {
+            _rebalance();
+        }
+
+        if (msg.sig == this.tend.selector) {
+            // Compound gov tokens without a vault report: claim, sell and mint below
+            IdleReservoir(idleReservoir()).drip();
+            _idleToken.redeemIdleToken(0);
+            _claimExtraGovTokens();
+            _liquidateGovTokens();
+        }
+
+        uint256 toKeep = _toKeep(_debtOutstanding);
         uint256 balanceOfWant = balanceOfWant();
-        if (balanceOfWant > _debtOutstanding) {
-            IIdleTokenV4(idleYieldToken).mintIdleToken(balanceOfWant.sub(_debtOutstanding), true, referral);
+        if (balanceOfWant > toKeep) {
+            // Dust and small deposits accumulate, a mint can cost more than it earns
+            uint256 toDeploy = balanceOfWant.sub(toKeep);
+            if (toDeploy >= minDeployAmount) {
+                _activeIdleToken(_idleToken).mintIdleToken(toDeploy, true, referral());
+            }
+        } else if (balanceOfWant < toKeep && balanceOfWant >= _debtOutstanding) {
+            // Refill the buffer after withdrawals, capped to what is left in Idle
+            uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+            uint256 toFree =
+                Math.min(toKeep.sub(balanceOfWant), idleTokenBalance.mul(tokenPrice).div(1e18).add(_extraAssets()));
+            if (toFree > 0) {
+                freeAmount(_idleToken, toFree, tokenPrice, idleTokenBalance, balanceOfWant);
+            }
         }
     }
 
+    function _activeIdleToken(IIdleTokenV4 _idleToken) internal view returns (IIdleTokenV4) {
+        uint8 index = activeIdleTokenIndex;
+        return index == 0 ? _idleToken : IIdleTokenV4(extraIdleTokens[index - 1]);
+    }
+
+    function _idleTokenAt(uint256 _index) internal view returns (IIdleTokenV4) {
+        return IIdleTokenV4(_index == 0 ? idleYieldToken() : extraIdleTokens[_index - 1]);
+    }
+
     /*
-     * Safely free an amount from Idle protocol
+     * Move capital to the IdleToken with the best APR once the extra yield over rebalanceHorizon
+     * pays for the redeems and the mint. Only redeems here, the want is minted by adjustPosition
      */
-    function freeAmount(uint256 _amount) internal updateVirtualPrice returns (uint256 freedAmount) {
-        uint256 valueToRedeemApprox = _amount.mul(1e18).div(lastVirtualPrice) + 1;
-        uint256 valueToRedeem = Math.min(valueToRedeemApprox, IERC20(idleYieldToken).balanceOf(address(this)));
+    function _rebalance() internal {
+        uint256 length = extraIdleTokens.length + 1;
+        uint256[] memory aprs = new uint256[](length);
+        for (uint256 i = 0; i < length; i++) {
+            aprs[i] = _idleTokenAt(i).getAvgAPR();
+        }
 
-        alreadyRedeemed = true;
+        // Ties keep the active IdleToken
+        uint256 best = activeIdleTokenIndex;
+        for (uint256 i = 0; i < length; i++) {
+            if (aprs[i] > aprs[best]) {
+                best = i;
+            }
+        }
+        if (best == activeIdleTokenIndex) {
+            return;
+        }
 
-        uint256 preBalanceOfWant = balanceOfWant();
-        IIdleTokenV4(idleYieldToken).redeemIdleToken(valueToRedeem);
-        freedAmount = balanceOfWant().sub(preBalanceOfWant);
+        (uint256 gain, uint256 moves) = _rebalanceGain(aprs, best);
+        // Nothing to move: only new want goes to the best IdleToken
+        if (moves > 0 && gain <= ethToWant(rebalanceGas.mul(moves + 1).mul(tx.gasprice))) {
+            return;
+        }
+
+        for (uint256 i = 0; i < length; i++) {
+            IIdleTokenV4 _idleToken = _idleTokenAt(i);
+            uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+            if (i == best || idleTokenBalance == 0) {
+                continue;
+            }
+            uint256 tokenPrice = _idleToken.tokenPriceWithFee(address(this));
+            if (i == 0) {
+                _updateVirtualPrice(tokenPrice);
+            } else {
+                _updateExtraVirtualPrice(address(_idleToken), tokenPrice);
+            }
+            _idleToken.redeemIdleToken(idleTokenBalance);
+        }
+
+        activeIdleTokenIndex = uint8(best);
+    }
+
+    // Yield gained over rebalanceHorizon by moving everything to `_best`, and the number of redeems
+    function _rebalanceGain(uint256[] memory _aprs, uint256 _best)
+        internal
+        view
+        returns (uint256 gain, uint256 moves)
+    {
+        for (uint256 i = 0; i < _aprs.length; i++) {
+            IIdleTokenV4 _idleToken = _idleTokenAt(i);
+            uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+            if (i == _best || idleTokenBalance == 0) {
+                continue;
+            }
+            uint256 value = idleTokenBalance.mul(_idleToken.tokenPriceWithFee(address(this))).div(1e18);
+            gain = gain.add(value.mul(_aprs[_best].sub(_aprs[i])));
+            moves++;
+        }
+        // Idle APRs are percentages with 18 decimals
+        gain = gain.mul(rebalanceHorizon).div(uint256(100e18).mul(365 days));
+    }
+
+    // Want kept out of Idle: the debt outstanding plus the withdrawal buffer
+    function _toKeep(uint256 _debtOutstanding) internal view returns (uint256) {
+        uint256 _bufferRatio = bufferRatio;
+        if (_bufferRatio == 0) {
+            return _debtOutstanding;
+        }
+        return _debtOutstanding.add(vault.strategies(address(this)).totalDebt.mul(_bufferRatio).div(MAX_BPS));
+    }
+
+    /*
+     * Safely free an amount from Idle protocol
+     * Callers already checked the virtual price and pass in the values they read
+     */
+    function freeAmount(
+        IIdleTokenV4 _idleToken,
+        uint256 _amount,
+        uint256 _tokenPrice,
+        uint256 _idleTokenBalance,
+        uint256 _wantBalance
+    ) internal returns (uint256 freedAmount) {
+        uint256 valueToRedeemApprox = _amount.mul(1e18).div(_tokenPrice) + 1;
+        uint256 valueToRedeem = Math.min(valueToRedeemApprox, _idleTokenBalance);
+
+        _idleToken.redeemIdleToken(valueToRedeem);
+        freedAmount = balanceOfWant().sub(_wantBalance);
+
+        // idleYieldToken ran out, the rest is held by the extra IdleTokens
+        if (valueToRedeem < valueToRedeemApprox && freedAmount < _amount) {
+            _freeExtra(_amount.sub(freedAmount));
+            freedAmount = balanceOfWant().sub(_wantBalance);
+        }
 
         if (checkRedeemedAmount) {
             // Note: could be equal, prefer >= in case of rounding
@@ -301,6 +617,36 @@ contract StrategyIdle is BaseStrategyInitializable {
         return freedAmount;
     }
 
+    function _freeExtra(uint256 _amount) internal {
+        address[] memory _extraIdleTokens = extraIdleTokens;
+        uint256 wantBalance = balanceOfWant();
+        uint256 target = wantBalance.add(_amount);
+        for (uint256 i = 0; i < _extraIdleTokens.length && wantBalance < target; i++) {
+            IIdleTokenV4 _idleToken = IIdleTokenV4(_extraIdleTokens[i]);
+            uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+            if (idleTokenBalance == 0) {
+                continue;
+            }
+            uint256 tokenPrice = _idleToken.tokenPriceWithFee(address(this));
+            _updateExtraVirtualPrice(address(_idleToken), tokenPrice);
+            _idleToken.redeemIdleToken(
+                Math.min(target.sub(wantBalance).mul(1e18).div(tokenPrice) + 1, idleTokenBalance)
+            );
+            wantBalance = balanceOfWant();
+        }
+    }
+
+    // Redeeming 0 claims the gov tokens of the extra IdleTokens held
+    function _claimExtraGovTokens() internal {
+        address[] memory _extraIdleTokens = extraIdleTokens;
+        for (uint256 i = 0; i < _extraIdleTokens.length; i++) {
+            IIdleTokenV4 _idleToken = IIdleTokenV4(_extraIdleTokens[i]);
+            if (_idleToken.balanceOf(address(this)) != 0) {
+                _idleToken.redeemIdleToken(0);
+            }
+        }
+    }
+
     /*
      * Liquidate as many assets as possible to `want`, irregardless of slippage,
      * up to `_amountNeeded`. Any excess should be re-invested here as well.
@@ -308,16 +654,21 @@ contract StrategyIdle is BaseStrategyInitializable {
     function liquidatePosition(uint256 _amountNeeded)
         internal
         override
-        updateVirtualPrice
         returns (uint256 _liquidatedAmount, uint256 _loss)
     {
         uint256 wantBalance = balanceOfWant();
 
+        // Served from the want buffer when possible, Idle is only touched for the missing part
         if (wantBalance < _amountNeeded) {
+            IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken());
+            uint256 tokenPrice = _idleToken.tokenPriceWithFee(address(this));
+            _updateVirtualPrice(tokenPrice);
+
             // Note: potential drift by 1 wei, reduce to max balance in the case approx is rounded up
             uint256 amountToRedeem = _amountNeeded.sub(wantBalance);
-            freeAmount(amountToRedeem);
-            wantBalance = balanceOfWant();
+            wantBalance = wantBalance.add(
+                freeAmount(_idleToken, amountToRedeem, tokenPrice, _idleToken.balanceOf(address(this)), wantBalance)
+            );
         }
 
         // _liquidatedAmount min(_amountNeeded, balanceOfWant), otw vault accounting breaks
@@ -331,16 +682,57 @@ contract StrategyIdle is BaseStrategyInitializable {
 
     // NOTE: Can override `tendTrigger` and `harvestTrigger` if necessary
 
-    function harvestTrigger(uint256 callCost) public view override returns (bool) {
-        return super.harvestTrigger(ethToWant(callCost));
+    /**
+     * Same rules as BaseStrategy, except that the profit a harvest would realize
+     * includes the gov tokens held and accrued, priced through the converter
+     * (unless tend compounds them)
+     */
+    function harvestTrigger(uint256 callCostInWei) public view override returns (bool) {
+        StrategyParams memory params = vault.strategies(address(this));
+
+        // Should not trigger if Strategy is not activated
+        if (params.activation == 0) return false;
+
+        // Should not trigger if we haven't waited long enough since previous harvest
+        if (block.timestamp.sub(params.lastReport) < minReportDelay) return false;
+
+        // Should trigger if hasn't been called in a while
+        if (block.timestamp.sub(params.lastReport) >= maxReportDelay) return true;
+
+        // If some amount is owed, pay it back
+        if (vault.debtOutstanding() > debtThreshold) return true;
+
+        // Check for profits and losses
+        uint256 total = estimatedTotalAssets();
+        // Trigger if we have a loss to report
+        if (total.add(debtThreshold) < params.totalDebt) return true;
+
+        uint256 profit = 0;
+        if (total > params.totalDebt) profit = total.sub(params.totalDebt);
+        if (tendProfitFactor == 0) {
+            profit = profit.add(estimatedGovTokensValue());
+        }
+
+        // Otherwise, only trigger if it "makes sense" economically (gas cost
+        // is <N% of value moved)
+        uint256 credit = vault.creditAvailable();
+        return (profitFactor.mul(ethToWant(callCostInWei)) < credit.add(profit));
+    }
+
+    function tendTrigger(uint256 callCostInWei) public view override returns (bool) {
+        uint256 _tendProfitFactor = tendProfitFactor;
+        if (_tendProfitFactor == 0 || emergencyExit || vault.strategies(address(this)).activation == 0) {
+            return false;
+        }
+
+        return _tendProfitFactor.mul(ethToWant(callCostInWei)) < estimatedGovTokensValue();
     }
 
     function prepareMigration(address _newStrategy) internal override {
         // NOTE: `migrate` will automatically forward all `want` in this strategy to the new one
 
         // this automatically claims the gov tokens in addition to want
-        IIdleTokenV4 _idleToken = IIdleTokenV4(idleYieldToken);
-        _idleToken.redeemIdleToken(_idleToken.balanceOf(address(this)));
+        _redeemAll();
 
         // Transfer gov tokens to new strategy
         address[] memory _govTokens = govTokens;
@@ -359,18 +751,39 @@ contract StrategyIdle is BaseStrategyInitializable {
      */
 
     function liquidateAllPositions() internal override returns (uint256 _amountFreed) {
-        IIdleTokenV4(idleYieldToken).redeemIdleToken(IERC20(idleYieldToken).balanceOf(address(this)));
+        _redeemAll();
 
         _amountFreed = balanceOfWant();
     }
 
+    // A partial redeem would be reported as a loss (emergency exit) or left behind (migration),
+    // so positions above unwindChunk revert until unwind() brought them down to the last chunk
+    function _redeemAll() internal {
+        uint256 chunk = unwindChunk;
+        uint256 length = extraIdleTokens.length + 1;
+        for (uint256 i = 0; i < length; i++) {
+            IIdleTokenV4 _idleToken = _idleTokenAt(i);
+            uint256 idleTokenBalance = _idleToken.balanceOf(address(this));
+            require(chunk == 0 || idleTokenBalance <= chunk, "unwind not complete");
+
+            // idleYieldToken is always redeemed, redeeming 0 claims its gov tokens
+            if (i == 0 || idleTokenBalance != 0) {
+                _idleToken.redeemIdleToken(idleTokenBalance);
+            }
+        }
+    }
+
     function protectedTokens() internal view override returns (address[] memory) {
-        address[] memory protected = new address[](1 + govTokens.length);
+        address[] memory _extraIdleTokens = extraIdleTokens;
+        address[] memory protected = new address[](1 + govTokens.length + _extraIdleTokens.length);
 
         for (uint256 i = 0; i < govTokens.length; i++) {
             protected[i] = govTokens[i];
         }
-        protected[govTokens.length] = idleYieldToken;
+        protected[govTokens.length] = idleYieldToken();
+        for (uint256 i = 0; i < _extraIdleTokens.length; i++) {
+            protected[govTokens.length + 1 + i] = _extraIdleTokens[i];
+        }
 
         return protected;
     }
@@ -384,27 +797,168 @@ contract StrategyIdle is BaseStrategyInitializable {
             return 0;
         }
 
-        return IConverter(converter).getAmountOut(_amount, weth, address(want));
+        uint256 _rateStaleness = rateStaleness;
+        if (_rateStaleness > 0 && block.timestamp <= uint256(wethToWantRateUpdatedAt).add(_rateStaleness)) {
+            return _amount.mul(wethToWantRate).div(1e18);
+        }
+
+        return IConverter(converter).getAmountOut(_amount, getWeth(), address(want));
+    }
+
+    function _updateWethToWantRate() internal {
+        // try/catch doesn't catch calls to accounts without code
+        if (!converter.isContract()) {
+            return;
+        }
+
+        // Pricing must not block a harvest, keep the previous rate when the quote fails
+        try IConverter(converter).getAmountOut(1e18, getWeth(), address(want)) returns (uint256 rate) {
+            // A require here wouldn't be caught, a quote that doesn't fit is skipped like a failed one
+            if (rate <= type(uint128).max) {
+                wethToWantRate = uint128(rate);
+                wethToWantRateUpdatedAt = uint64(block.timestamp);
+            }
+        } catch {}
+    }
+
+    /**
+     * @return value : gov tokens held and accrued in every IdleToken, in want
+     */
+    function estimatedGovTokensValue() public view returns (uint256 value) {
+        address[] memory _govTokens = govTokens;
+        uint256[] memory amounts = new uint256[](_govTokens.length);
+        for (uint256 i = 0; i < _govTokens.length; i++) {
+            amounts[i] = IERC20(_govTokens[i]).balanceOf(address(this));
+        }
+
+        _addAccruedGovTokens(IIdleTokenV4(idleYieldToken()), _govTokens, amounts);
+        address[] memory _extraIdleTokens = extraIdleTokens;
+        for (uint256 i = 0; i < _extraIdleTokens.length; i++) {
+            _addAccruedGovTokens(IIdleTokenV4(_extraIdleTokens[i]), _govTokens, amounts);
+        }
+
+        // try/catch doesn't catch calls to accounts without code
+        if (!converter.isContract()) {
+            return 0;
+        }
+
+        IConverter _converter = IConverter(converter);
+        for (uint256 i = 0; i < _govTokens.length; i++) {
+            // A gov token without a keeper rate or a route is worth nothing to a harvest
+            if (amounts[i] == 0 || minGovTokenRates[_govTokens[i]] == 0) {
+                continue;
+            }
+            try _converter.getAmountOut(amounts[i], _govTokens[i], address(want)) returns (uint256 amountOut) {
+                value = value.add(amountOut);
+            } catch {}
+        }
+    }
+
+    function _addAccruedGovTokens(
+        IIdleTokenV4 _idleToken,
+        address[] memory _govTokens,
+        uint256[] memory amounts
+    ) internal view {
+        // Accrued amounts are ordered as the IdleToken gov tokens, which can differ from ours
+        try _idleToken.getGovTokensAmounts(address(this)) returns (uint256[] memory accrued) {
+            address[] memory idleGovTokens = _idleToken.getGovTokens();
+            for (uint256 i = 0; i < idleGovTokens.length && i < accrued.length; i++) {
+                for (uint256 j = 0; j < _govTokens.length; j++) {
+                    if (idleGovTokens[i] == _govTokens[j]) {
+                        amounts[j] = amounts[j].add(accrued[i]);
+                        break;
+                    }
+                }
+            }
+        } catch {}
     }
 
     function getTokenPrice() public view returns (uint256) {
         return _getTokenPrice();
     }
 
+    function _updateVirtualPrice(uint256 _currentTokenPrice) internal {
+        if (checkVirtualPrice) {
+            require(
+                lastVirtualPrice <= _currentTokenPrice,
+                "Virtual price is decreasing from the last time, potential losses"
+            );
+        }
+        lastVirtualPrice = _currentTokenPrice;
+    }
+
+    function _updateExtraVirtualPrice(address _idleToken, uint256 _currentTokenPrice) internal {
+        if (checkVirtualPrice) {
+            require(
+                extraVirtualPrices[_idleToken] <= _currentTokenPrice,
+                "Virtual price is decreasing from the last time, potential losses"
+            );
+        }
+        extraVirtualPrices[_idleToken] = _currentTokenPrice;
+    }
+
     function _liquidateGovTokens() internal returns (uint256 liquidated) {
-        for (uint256 i = 0; i < govTokens.length; i++) {
-            address govTokenAddress = govTokens[i];
-            uint256 balance = IERC20(govTokenAddress).balanceOf(address(this));
-            if (balance > 0) {
-                uint256 convertedAmount =
-                    IConverter(converter).convert(balance, 1, govTokenAddress, address(want), address(this));
+        address[] memory _govTokens = govTokens;
+        uint256 length = _govTokens.length;
+        IConverter _converter = IConverter(converter);
+        address _want = address(want);
+
+        if (batchConverter) {
+            // Route every gov token to WETH and swap WETH to want once
+            uint256[] memory amounts = new uint256[](length);
+            uint256 amountOutMin;
+            for (uint256 i = 0; i < length; i++) {
+                uint256 balance = IERC20(_govTokens[i]).balanceOf(address(this));
+                uint256 minOut = _minGovTokenOut(_govTokens[i], balance);
+                // Gov tokens without a rate stay out of the batch
+                if (minOut > 0) {
+                    amounts[i] = balance;
+                    amountOutMin = amountOutMin.add(minOut);
+                }
+            }
+
+            if (amountOutMin == 0) {
+                return 0;
+            }
 
-                // leverage uniswap returns want amount
-                liquidated = liquidated.add(convertedAmount);
+            // When the output is below the keeper rates the gov tokens are kept for the next harvest
+            try
+                IBatchConverter(address(_converter)).convertMany(_govTokens, amounts, amountOutMin, _want, address(this))
+            returns (uint256 convertedAmount) {
+                return convertedAmount;
+            } catch {
+                // One gov token without a route or over its bound reverts the whole batch,
+                // convert them one by one so the others still go through
+            }
+        }
+
+        for (uint256 i = 0; i < length; i++) {
+            address govTokenAddress = _govTokens[i];
+            uint256 balance = IERC20(govTokenAddress).balanceOf(address(this));
+            uint256 minOut = _minGovTokenOut(govTokenAddress, balance);
+            if (minOut > 0) {
+                // Skip the gov token when its output is below the keeper rate, retry on the next harvest
+                try _converter.convert(balance, minOut, govTokenAddress, _want, address(this)) returns (
+                    uint256 convertedAmount
+                ) {
+                    // leverage uniswap returns want amount
+                    liquidated = liquidated.add(convertedAmount);
+                } catch {
+                    emit GovTokenConversionFailed(govTokenAddress, balance);
+                }
             }
         }
     }
 
+    // Min want out of _amount gov tokens, 0 when there is nothing to sell or no keeper rate
+    function _minGovTokenOut(address _govToken, uint256 _amount) internal view returns (uint256) {
+        uint256 rate = minGovTokenRates[_govToken];
+        if (_amount == 0 || rate == 0) {
+            return 0;
+        }
+        return Math.max(_amount.mul(rate).div(1e18), 1);
+    }
+
     function _setGovTokens(address[] memory _govTokens) internal {
         require(_govTokens.length <= MAX_GOV_TOKENS_LENGTH, "GovTokens too long");
 
@@ -424,6 +978,15 @@ contract StrategyIdle is BaseStrategyInitializable {
         }
     }
 
+    function _supportsBatchConversion(address _converter) internal view returns (bool) {
+        // Older converters and EOAs don't implement ERC165, a failed call means no support
+        (bool success, bytes memory result) =
+            _converter.staticcall(
+                abi.encodeWithSelector(IERC165.supportsInterface.selector, type(IBatchConverter).interfaceId)
+            );
+        return success && result.length == 32 && abi.decode(result, (bool));
+    }
+
     function getConverter() external view returns (address) {
         return converter;
     }
@@ -438,6 +1001,8 @@ contract StrategyIdle is BaseStrategyInitializable {
 
         // Set new converter
         converter = _converter;
+        batchConverter = _supportsBatchConversion(_converter);
+        _updateWethToWantRate();
     }
 
     function disableConverter() external onlyKeepers {
@@ -452,8 +1017,49 @@ contract StrategyIdle is BaseStrategyInitializable {
         return govTokens;
     }
 
-    function getWeth() external view returns (address) {
-        return weth;
+    function getExtraIdleTokens() external view returns (address[] memory) {
+        return extraIdleTokens;
+    }
+
+    function _contains(
+        address[] memory _addresses,
+        address _address,
+        uint256 _length
+    ) internal pure returns (bool) {
+        for (uint256 i = 0; i < _length; i++) {
+            if (_addresses[i] == _address) {
+                return true;
+            }
+        }
+        return false;
+    }
+
+    function _setImmutables(
+        address _weth,
+        address _idleReservoir,
+        address _idleYieldToken,
+        address _referral
+    ) internal virtual {
+        idleReservoirStored = _idleReservoir;
+        idleYieldTokenStored = _idleYieldToken;
+        referralStored = _referral;
+        wethStored = _weth;
+    }
+
+    function getWeth() public view virtual returns (address) {
+        return wethStored;
+    }
+
+    function idleReservoir() public view virtual returns (address) {
+        return idleReservoirStored;
+    }
+
+    function idleYieldToken() public view virtual returns (address) {
+        return idleYieldTokenStored;
+    }
+
+    function referral() public view virtual returns (address) {
+        return referralStored;
     }
 
     function _getTokenPrice() internal view returns (uint256) {
@@ -476,6 +1082,6 @@ contract StrategyIdle is BaseStrategyInitializable {
          *  n.b: gain := idleTokenAmount * ΔP% * currentPrice
          */
 
-        return IIdleTokenV4(idleYieldToken).tokenPriceWithFee(address(this));
+        return IIdleTokenV4(idleYieldToken()).tokenPriceWithFee(address(this));
     }
 }
@@ -0,0 +1,68 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "./StrategyIdle.sol";
+
+/**
+ * Logic of clones with immutable args (ProxyFactoryInitializable.deployMinimalWithArgs): the 45 bytes
+ * EIP-1167 runtime followed by weth, idleReservoir, idleYieldToken and referral, packed.
+ * They are read from the clone code instead of storage, a warm EXTCODECOPY on address(this) instead
+ * of a SLOAD (2100 gas cold). Being a separate logic, StrategyIdle and its regular clones don't pay
+ * for telling the two kinds apart.
+ */
+contract StrategyIdleImmutableArgs is StrategyIdle {
+    constructor(
+        address _vault,
+        address[] memory _govTokens,
+        address _weth,
+        address _idleReservoir,
+        address _idleYieldToken,
+        address _referral,
+        address _converter
+    ) public StrategyIdle(_vault, _govTokens, _weth, _idleReservoir, _idleYieldToken, _referral, _converter) {}
+
+    function _setImmutables(
+        address _weth,
+        address _idleReservoir,
+        address _idleYieldToken,
+        address _referral
+    ) internal override {
+        // The logic contract itself has no args in its code, its code is empty while constructing
+        if (!address(this).isContract()) {
+            return;
+        }
+
+        require(
+            _weth == _immutableArg(0) &&
+                _idleReservoir == _immutableArg(1) &&
+                _idleYieldToken == _immutableArg(2) &&
+                _referral == _immutableArg(3),
+            "Immutable args mismatch"
+        );
+    }
+
+    function getWeth() public view override returns (address) {
+        return _immutableArg(0);
+    }
+
+    function idleReservoir() public view override returns (address) {
+        return _immutableArg(1);
+    }
+
+    function idleYieldToken() public view override returns (address) {
+        return _immutableArg(2);
+    }
+
+    function referral() public view override returns (address) {
+        return _immutableArg(3);
+    }
+
+    // NOTE: codecopy would read the logic code, the clone code is read with extcodecopy on address(this)
+    function _immutableArg(uint256 _index) internal view returns (address arg) {
+        assembly {
+            extcodecopy(address(), 0, add(45, mul(_index, 20)), 20)
+            arg := shr(96, mload(0))
+        }
+    }
+}
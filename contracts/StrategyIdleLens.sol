@@ -0,0 +1,78 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import { StrategyParams, VaultAPI } from "@yearnvaults/contracts/BaseStrategy.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import "../interfaces/Idle/IdleController.sol";
+
+import "./StrategyIdle.sol";
+
+/**
+ * Read-only snapshots of StrategyIdle state, so dashboards and keepers
+ * can poll many strategies with a single eth_call
+ */
+contract StrategyIdleLens {
+    struct Snapshot {
+        address strategy;
+        // False when the strategy couldn't be read, every other field is empty
+        bool ok;
+        address vault;
+        address want;
+        address idleYieldToken;
+        uint256 estimatedTotalAssets;
+        uint256 tokenPrice;
+        uint256 lastVirtualPrice;
+        uint256 balanceOfWant;
+        uint256 idleTokenBalance;
+        uint256 idleAccrued;
+        address[] govTokens;
+        uint256[] govTokenBalances;
+        StrategyParams params;
+    }
+
+    IdleController public immutable idleController;
+
+    constructor(address _idleController) public {
+        idleController = IdleController(_idleController);
+    }
+
+    function snapshots(address[] calldata _strategies) external view returns (Snapshot[] memory result) {
+        result = new Snapshot[](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            // A strategy that reverts doesn't fail the whole batch
+            try this.snapshot(_strategies[i]) returns (Snapshot memory s) {
+                result[i] = s;
+            } catch {
+                result[i].strategy = _strategies[i];
+            }
+        }
+    }
+
+    function snapshot(address _strategy) public view returns (Snapshot memory s) {
+        StrategyIdle strategy = StrategyIdle(_strategy);
+
+        s.strategy = _strategy;
+        s.ok = true;
+        s.vault = address(strategy.vault());
+        s.want = address(strategy.want());
+        s.idleYieldToken = strategy.idleYieldToken();
+        s.estimatedTotalAssets = strategy.estimatedTotalAssets();
+        s.tokenPrice = strategy.getTokenPrice();
+        s.lastVirtualPrice = strategy.lastVirtualPrice();
+        s.balanceOfWant = strategy.balanceOfWant();
+        s.idleTokenBalance = IERC20(s.idleYieldToken).balanceOf(_strategy);
+        if (address(idleController) != address(0)) {
+            s.idleAccrued = idleController.idleAccrued(_strategy);
+        }
+
+        s.govTokens = strategy.getGovTokens();
+        s.govTokenBalances = new uint256[](s.govTokens.length);
+        for (uint256 i = 0; i < s.govTokens.length; i++) {
+            s.govTokenBalances[i] = IERC20(s.govTokens[i]).balanceOf(_strategy);
+        }
+
+        s.params = VaultAPI(s.vault).strategies(_strategy);
+    }
+}
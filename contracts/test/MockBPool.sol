@@ -0,0 +1,93 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./MockERC20.sol";
+
+/// @dev Balancer BPool with equal weights (constant product), used by the local (mock) test harness.
+/// Balances are set by the tests, input tokens are kept and output tokens are minted.
+contract MockBPool {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    event LOG_SWAP(
+        address indexed caller,
+        address indexed tokenIn,
+        address indexed tokenOut,
+        uint256 tokenAmountIn,
+        uint256 tokenAmountOut
+    );
+
+    uint256 public constant BONE = 10**18;
+    uint256 public constant MAX_IN_RATIO = BONE / 2;
+    uint256 public constant DENORM_WEIGHT = 25 * BONE;
+
+    mapping(address => uint256) internal balances;
+    uint256 internal swapFee = 3 * 10**15;
+
+    function setBalance(address _token, uint256 _balance) external {
+        balances[_token] = _balance;
+    }
+
+    function setSwapFee(uint256 _swapFee) external {
+        swapFee = _swapFee;
+    }
+
+    function getBalance(address _token) external view returns (uint256) {
+        return balances[_token];
+    }
+
+    function getSwapFee() external view returns (uint256) {
+        return swapFee;
+    }
+
+    function getDenormalizedWeight(address) external pure returns (uint256) {
+        return DENORM_WEIGHT;
+    }
+
+    function calcOutGivenIn(
+        uint256 tokenBalanceIn,
+        uint256 tokenWeightIn,
+        uint256 tokenBalanceOut,
+        uint256 tokenWeightOut,
+        uint256 tokenAmountIn,
+        uint256 _swapFee
+    ) public pure returns (uint256) {
+        require(tokenWeightIn == tokenWeightOut, "MockBPool: equal weights only");
+        uint256 amountInAfterFee = tokenAmountIn.mul(BONE.sub(_swapFee)).div(BONE);
+        return tokenBalanceOut.mul(amountInAfterFee).div(tokenBalanceIn.add(amountInAfterFee));
+    }
+
+    function getSpotPrice(address tokenIn, address tokenOut) public view returns (uint256) {
+        return balances[tokenIn].mul(BONE).div(balances[tokenOut]).mul(BONE).div(BONE.sub(swapFee));
+    }
+
+    function swapExactAmountIn(
+        address tokenIn,
+        uint256 tokenAmountIn,
+        address tokenOut,
+        uint256 minAmountOut,
+        uint256 maxPrice
+    ) external returns (uint256 tokenAmountOut, uint256 spotPriceAfter) {
+        uint256 balanceIn = balances[tokenIn];
+        uint256 balanceOut = balances[tokenOut];
+        require(tokenAmountIn <= balanceIn.mul(MAX_IN_RATIO).div(BONE), "ERR_MAX_IN_RATIO");
+
+        tokenAmountOut = calcOutGivenIn(balanceIn, DENORM_WEIGHT, balanceOut, DENORM_WEIGHT, tokenAmountIn, swapFee);
+        require(tokenAmountOut >= minAmountOut, "ERR_LIMIT_OUT");
+
+        IERC20(tokenIn).safeTransferFrom(msg.sender, address(this), tokenAmountIn);
+
+        balances[tokenIn] = balanceIn.add(tokenAmountIn);
+        balances[tokenOut] = balanceOut.sub(tokenAmountOut);
+
+        spotPriceAfter = getSpotPrice(tokenIn, tokenOut);
+        require(spotPriceAfter <= maxPrice, "ERR_LIMIT_PRICE");
+
+        emit LOG_SWAP(msg.sender, tokenIn, tokenOut, tokenAmountIn, tokenAmountOut);
+
+        MockERC20(tokenOut).mint(msg.sender, tokenAmountOut);
+    }
+}
@@ -0,0 +1,20 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+contract MockHealthCheck {
+    bool public result = true;
+
+    function setResult(bool _result) external {
+        result = _result;
+    }
+
+    function check(
+        uint256,
+        uint256,
+        uint256,
+        uint256,
+        uint256
+    ) external view returns (bool) {
+        return result;
+    }
+}
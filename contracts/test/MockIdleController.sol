@@ -0,0 +1,11 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+/// @dev IdleController with IDLE accrued set by the tests, used by the local (mock) test harness.
+contract MockIdleController {
+    mapping(address => uint256) public idleAccrued;
+
+    function setIdleAccrued(address _user, uint256 _idleAccrued) external {
+        idleAccrued[_user] = _idleAccrued;
+    }
+}
@@ -0,0 +1,13 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "../../interfaces/Idle/IdleReservoir.sol";
+
+contract MockIdleReservoir is IdleReservoir {
+    uint256 public drips;
+
+    function drip() external override returns (uint256) {
+        drips += 1;
+        return 0;
+    }
+}
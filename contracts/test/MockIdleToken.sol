@@ -0,0 +1,171 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./MockERC20.sol";
+
+/// @dev Minimal IdleTokenV4 used by the local (mock) test harness.
+/// Price, fee and gov token accrual are set by the tests, underlying and gov tokens
+/// are minted on demand so that price increases can always be redeemed.
+contract MockIdleToken is ERC20 {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 public constant FULL_ALLOC = 100000;
+
+    address public token;
+    uint256 public tokenPrice;
+    uint256 public fee;
+    uint256 public avgAPR;
+
+    mapping(address => uint256) public userAvgPrices;
+
+    address[] internal govTokens;
+    // gov token => amount accrued per block for each 1e18 IdleTokens held
+    mapping(address => uint256) public govTokenRates;
+    // user => gov token => accrued and not yet claimed
+    mapping(address => mapping(address => uint256)) internal govTokensAccrued;
+    mapping(address => uint256) internal lastAccrualBlock;
+
+    constructor(
+        address _token,
+        string memory _name,
+        string memory _symbol
+    ) public ERC20(_name, _symbol) {
+        token = _token;
+        tokenPrice = 10**uint256(ERC20(_token).decimals());
+        fee = 10000;
+    }
+
+    function setTokenPrice(uint256 _tokenPrice) external {
+        tokenPrice = _tokenPrice;
+    }
+
+    function setFee(uint256 _fee) external {
+        require(_fee <= FULL_ALLOC, "Fee too high");
+        fee = _fee;
+    }
+
+    function setAvgAPR(uint256 _avgAPR) external {
+        avgAPR = _avgAPR;
+    }
+
+    function setGovTokens(address[] calldata _govTokens) external {
+        govTokens = _govTokens;
+    }
+
+    function setGovTokenRate(address _govToken, uint256 _rate) external {
+        govTokenRates[_govToken] = _rate;
+    }
+
+    function getGovTokens() external view returns (address[] memory) {
+        return govTokens;
+    }
+
+    function getGovTokensAmounts(address _user) external view returns (uint256[] memory amounts) {
+        amounts = new uint256[](govTokens.length);
+        for (uint256 i = 0; i < govTokens.length; i++) {
+            amounts[i] = govTokensAccrued[_user][govTokens[i]].add(_pendingGovTokens(_user, govTokens[i]));
+        }
+    }
+
+    function getAPRs() external view returns (address[] memory addresses, uint256[] memory aprs) {
+        addresses = new address[](1);
+        aprs = new uint256[](1);
+        addresses[0] = address(this);
+        aprs[0] = avgAPR;
+    }
+
+    function getAvgAPR() external view returns (uint256) {
+        return avgAPR;
+    }
+
+    function tokenPriceWithFee(address _user) public view returns (uint256 priceWFee) {
+        uint256 avgPrice = userAvgPrices[_user];
+        priceWFee = tokenPrice;
+        if (priceWFee > avgPrice) {
+            priceWFee = priceWFee.sub(priceWFee.sub(avgPrice).mul(fee).div(FULL_ALLOC));
+        }
+    }
+
+    function mintIdleToken(
+        uint256 _amount,
+        bool,
+        address
+    ) external returns (uint256 mintedTokens) {
+        IERC20(token).safeTransferFrom(msg.sender, address(this), _amount);
+
+        mintedTokens = _amount.mul(1e18).div(tokenPrice);
+        uint256 balance = balanceOf(msg.sender);
+        userAvgPrices[msg.sender] = balance.mul(userAvgPrices[msg.sender]).add(mintedTokens.mul(tokenPrice)).div(
+            balance.add(mintedTokens)
+        );
+
+        _mint(msg.sender, mintedTokens);
+    }
+
+    function redeemIdleToken(uint256 _amount) external returns (uint256 redeemedTokens) {
+        if (_amount > 0) {
+            redeemedTokens = _amount.mul(tokenPriceWithFee(msg.sender)).div(1e18);
+            _burn(msg.sender, _amount);
+
+            uint256 underlyingBalance = IERC20(token).balanceOf(address(this));
+            if (underlyingBalance < redeemedTokens) {
+                MockERC20(token).mint(address(this), redeemedTokens.sub(underlyingBalance));
+            }
+            IERC20(token).safeTransfer(msg.sender, redeemedTokens);
+        }
+
+        _claimGovTokens(msg.sender);
+    }
+
+    function rebalance() external pure returns (bool) {
+        return true;
+    }
+
+    function _claimGovTokens(address _user) internal {
+        _accrue(_user);
+        for (uint256 i = 0; i < govTokens.length; i++) {
+            address govToken = govTokens[i];
+            uint256 amount = govTokensAccrued[_user][govToken];
+            if (amount > 0) {
+                govTokensAccrued[_user][govToken] = 0;
+                MockERC20(govToken).mint(_user, amount);
+            }
+        }
+    }
+
+    function _accrue(address _user) internal {
+        for (uint256 i = 0; i < govTokens.length; i++) {
+            address govToken = govTokens[i];
+            govTokensAccrued[_user][govToken] = govTokensAccrued[_user][govToken].add(
+                _pendingGovTokens(_user, govToken)
+            );
+        }
+        lastAccrualBlock[_user] = block.number;
+    }
+
+    function _pendingGovTokens(address _user, address _govToken) internal view returns (uint256) {
+        if (lastAccrualBlock[_user] == 0) {
+            return 0;
+        }
+        return
+            balanceOf(_user).mul(govTokenRates[_govToken]).mul(block.number.sub(lastAccrualBlock[_user])).div(1e18);
+    }
+
+    function _beforeTokenTransfer(
+        address _from,
+        address _to,
+        uint256
+    ) internal override {
+        if (_from != address(0)) {
+            _accrue(_from);
+        }
+        if (_to != address(0)) {
+            _accrue(_to);
+        }
+    }
+}
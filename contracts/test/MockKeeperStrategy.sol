@@ -0,0 +1,40 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+/// @dev Strategy with triggers set by the tests, used to run the keeper against a local chain.
+contract MockKeeperStrategy {
+    event Harvested(address keeper);
+    event Tended(address keeper);
+
+    bool public harvestTriggered;
+    bool public tendTriggered;
+    uint256 public harvests;
+    uint256 public tends;
+
+    function setTriggers(bool _harvestTriggered, bool _tendTriggered) external {
+        harvestTriggered = _harvestTriggered;
+        tendTriggered = _tendTriggered;
+    }
+
+    function harvestTrigger(uint256) external view returns (bool) {
+        return harvestTriggered;
+    }
+
+    function tendTrigger(uint256) external view returns (bool) {
+        return tendTriggered;
+    }
+
+    function harvest() external {
+        harvests++;
+        // A harvest adjusts the position as well
+        harvestTriggered = false;
+        tendTriggered = false;
+        emit Harvested(msg.sender);
+    }
+
+    function tend() external {
+        tends++;
+        tendTriggered = false;
+        emit Tended(msg.sender);
+    }
+}
@@ -0,0 +1,97 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "./MockERC20.sol";
+
+/// @dev Uniswap V2 style router over virtual constant product pairs.
+/// Reserves are set by the tests, input tokens are kept and output tokens are minted.
+contract MockUniswapRouter {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    event Swap(
+        address indexed sender,
+        uint256 amount0In,
+        uint256 amount1In,
+        uint256 amount0Out,
+        uint256 amount1Out,
+        address indexed to
+    );
+
+    // reserves[tokenA][tokenB] is the reserve of tokenA in the (tokenA, tokenB) pair
+    mapping(address => mapping(address => uint256)) public reserves;
+
+    function setReserves(
+        address _tokenA,
+        address _tokenB,
+        uint256 _reserveA,
+        uint256 _reserveB
+    ) external {
+        reserves[_tokenA][_tokenB] = _reserveA;
+        reserves[_tokenB][_tokenA] = _reserveB;
+    }
+
+    function getAmountOut(
+        uint256 amountIn,
+        uint256 reserveIn,
+        uint256 reserveOut
+    ) public pure returns (uint256) {
+        require(amountIn > 0, "UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT");
+        require(reserveIn > 0 && reserveOut > 0, "UniswapV2Library: INSUFFICIENT_LIQUIDITY");
+        uint256 amountInWithFee = amountIn.mul(997);
+        return amountInWithFee.mul(reserveOut).div(reserveIn.mul(1000).add(amountInWithFee));
+    }
+
+    function getAmountIn(
+        uint256 amountOut,
+        uint256 reserveIn,
+        uint256 reserveOut
+    ) public pure returns (uint256) {
+        require(amountOut > 0, "UniswapV2Library: INSUFFICIENT_OUTPUT_AMOUNT");
+        require(reserveIn > 0 && reserveOut > amountOut, "UniswapV2Library: INSUFFICIENT_LIQUIDITY");
+        return reserveIn.mul(amountOut).mul(1000).div(reserveOut.sub(amountOut).mul(997)).add(1);
+    }
+
+    function getAmountsOut(uint256 amountIn, address[] memory path) public view returns (uint256[] memory amounts) {
+        require(path.length >= 2, "UniswapV2Library: INVALID_PATH");
+        amounts = new uint256[](path.length);
+        amounts[0] = amountIn;
+        for (uint256 i = 0; i < path.length - 1; i++) {
+            amounts[i + 1] = getAmountOut(amounts[i], reserves[path[i]][path[i + 1]], reserves[path[i + 1]][path[i]]);
+        }
+    }
+
+    function getAmountsIn(uint256 amountOut, address[] memory path) public view returns (uint256[] memory amounts) {
+        require(path.length >= 2, "UniswapV2Library: INVALID_PATH");
+        amounts = new uint256[](path.length);
+        amounts[amounts.length - 1] = amountOut;
+        for (uint256 i = path.length - 1; i > 0; i--) {
+            amounts[i - 1] = getAmountIn(amounts[i], reserves[path[i - 1]][path[i]], reserves[path[i]][path[i - 1]]);
+        }
+    }
+
+    function swapExactTokensForTokens(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address[] calldata path,
+        address to,
+        uint256 deadline
+    ) external returns (uint256[] memory amounts) {
+        require(deadline >= block.timestamp, "UniswapV2Router: EXPIRED");
+        amounts = getAmountsOut(amountIn, path);
+        require(amounts[amounts.length - 1] >= amountOutMin, "UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT");
+
+        IERC20(path[0]).safeTransferFrom(msg.sender, address(this), amountIn);
+
+        for (uint256 i = 0; i < path.length - 1; i++) {
+            reserves[path[i]][path[i + 1]] = reserves[path[i]][path[i + 1]].add(amounts[i]);
+            reserves[path[i + 1]][path[i]] = reserves[path[i + 1]][path[i]].sub(amounts[i + 1]);
+            emit Swap(msg.sender, amounts[i], 0, 0, amounts[i + 1], i < path.length - 2 ? address(this) : to);
+        }
+
+        MockERC20(path[path.length - 1]).mint(to, amounts[amounts.length - 1]);
+    }
+}
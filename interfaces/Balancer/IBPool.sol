@@ -12,4 +12,24 @@ interface IBPool {
     )
     external
     returns (uint tokenAmountOut, uint spotPriceAfter);
+
+    function getSpotPrice(address tokenIn, address tokenOut) external view returns (uint spotPrice);
+
+    function getBalance(address token) external view returns (uint);
+
+    function getDenormalizedWeight(address token) external view returns (uint);
+
+    function getSwapFee() external view returns (uint);
+
+    function calcOutGivenIn(
+        uint tokenBalanceIn,
+        uint tokenWeightIn,
+        uint tokenBalanceOut,
+        uint tokenWeightOut,
+        uint tokenAmountIn,
+        uint swapFee
+    )
+    external
+    pure
+    returns (uint tokenAmountOut);
 }
\ No newline at end of file
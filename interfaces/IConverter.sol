@@ -1,4 +1,3 @@
-
 // SPDX-License-Identifier: AGPL-3.0
 
 pragma solidity ^0.6.6;
@@ -14,4 +13,15 @@ interface IConverter {
 
     function getAmountOut(uint256 amountIn, address assetIn, address assetOut) external view returns (uint256 amountOut);
     function getAmountIn(uint256 amountOut, address assetIn, address assetOut) external view returns (uint256 amountIn);
-}
\ No newline at end of file
+}
+
+/// @notice Converters supporting batched conversions advertise it through ERC165
+interface IBatchConverter is IConverter {
+    function convertMany(
+        address[] calldata assetsIn,
+        uint256[] calldata amountsIn,
+        uint256 amountOutMin,
+        address assetOut,
+        address to
+    ) external returns (uint256 convertedAmount);
+}
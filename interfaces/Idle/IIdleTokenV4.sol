@@ -52,6 +52,26 @@ interface IIdleTokenV4 is IERC20 {
      */
     function getAPRs() external view returns (address[] memory addresses, uint256[] memory aprs);
 
+    /**
+     * Get current avg APR of this IdleToken
+     *
+     * @return avgApr : current weighted avg apr
+     */
+    function getAvgAPR() external view returns (uint256 avgApr);
+
+    /**
+     * @return : addresses of the governance tokens distributed by the IdleToken
+     */
+    function getGovTokens() external view returns (address[] memory);
+
+    /**
+     * Governance tokens accrued by a user and not claimed yet
+     *
+     * @param _usr : user address
+     * @return _amounts : amount of every governance token (ordered as `getGovTokens`)
+     */
+    function getGovTokensAmounts(address _usr) external view returns (uint256[] memory _amounts);
+
     // external
     // We should save the amount one has deposited to calc interests
 
@@ -0,0 +1,188 @@
+import csv
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365 * 86400
+# IdleTokenGovernance FULL_ALLOC, fee is in 1/FULL_ALLOC
+FULL_ALLOC = 100000
+
+# Columns of the series CSV, one row per block or sampling period:
+#       timestamp: unix seconds
+#      tokenPrice: IdleToken tokenPrice(), in want
+#        govValue: cumulative value of the gov tokens accrued by one IdleToken since the first row, in want
+#        gasPrice: gas price, in gwei
+#      wantPerEth: price of 1 ETH in want
+#       idlePrice: price of 1 IDLE in want
+COLUMNS = ("timestamp", "tokenPrice", "govValue", "gasPrice", "wantPerEth", "idlePrice")
+
+
+@dataclass(frozen=True)
+class Series:
+    timestamp: np.ndarray
+    tokenPrice: np.ndarray
+    govValue: np.ndarray
+    gasPrice: np.ndarray
+    wantPerEth: np.ndarray
+    idlePrice: np.ndarray
+
+    @classmethod
+    def load(cls, path: str) -> "Series":
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        return cls(**{column: np.array([float(row[column]) for row in rows]) for column in COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+
+@dataclass(frozen=True)
+class Params:
+    # Idle fee on gains over userAvgPrices, the mainnet IdleTokens take 10%
+    fee: int = 10000
+    # Share of the gov token value accrued as IDLE, the rest is COMP
+    idleShare: float = 0.5
+    # Realized slippage of COMP and of IDLE on Uniswap
+    slippage: float = 0.005
+    # Realized slippage of IDLE on Balancer, the converter takes it from minAmountIn IDLE
+    balancerSlippage: float = 0.002
+    harvestGas: int = 600_000
+    # Extra gas of a harvest that converts gov tokens
+    convertGas: int = 250_000
+    # Extra gas of the Balancer IDLE swap over the Uniswap one
+    balancerGas: int = 100_000
+    # Want deposited at the first row
+    deposit: float = 1_000_000
+
+
+def _conversion(value, idlePrice, minAmountIn, params: Params):
+    """
+    Want out of converting gov tokens worth `value` and its extra gas. The converter only quotes
+    Balancer for IDLE amounts of at least minAmountIn, smaller ones go through Uniswap
+    """
+    idleValue = value * params.idleShare
+    balancer = (idleValue > 0) & (idleValue / idlePrice >= minAmountIn)
+    idleSlippage = np.where(balancer, params.balancerSlippage, params.slippage)
+    converted = (value - idleValue) * (1 - params.slippage) + idleValue * (1 - idleSlippage)
+    gas = np.where(value > 0, params.convertGas, 0) + np.where(balancer, params.balancerGas, 0)
+    return converted, gas
+
+
+def sweep(
+    series: Series,
+    intervals: Sequence[int],
+    profitFactors: Sequence[float] = (0,),
+    minAmountsIn: Sequence[float] = (0,),
+    params: Params = Params(),
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate prepareReturn over the series for every combination of:
+        interval: rows between two harvests, the harvest waits while harvestTrigger would be false
+        profitFactor: a harvest needs an estimated profit above profitFactor times its gas cost
+        minAmountIn: converter minAmountIn (IDLE), the claimed IDLE goes through Balancer from this amount
+
+    Every harvest converts all the claimed gov tokens, as the strategy does.
+    Settings are the lanes of numpy arrays, the loop only runs over the rows of the series.
+    Returns the settings and their net APY, gas included, as flat arrays.
+    """
+    interval, profitFactor, minAmountIn = (
+        grid.ravel() for grid in np.meshgrid(intervals, profitFactors, minAmountsIn, indexing="ij")
+    )
+    interval = interval.astype(np.int64)
+    lanes = interval.size
+    feeRatio = params.fee / FULL_ALLOC
+
+    price0 = series.tokenPrice[0]
+    # IdleTokens held, userAvgPrices and the strategy debt to the vault, in want
+    balance = np.full(lanes, params.deposit / price0)
+    avgPrice = np.full(lanes, price0)
+    debt = np.full(lanes, params.deposit)
+    # Gov tokens accrued up to govMark are claimed and converted
+    govMark = np.full(lanes, series.govValue[0])
+    lastHarvest = np.zeros(lanes, dtype=np.int64)
+    gasSpent = np.zeros(lanes)
+    harvests = np.zeros(lanes, dtype=np.int64)
+
+    for row in range(1, len(series)):
+        price = series.tokenPrice[row]
+        priceWithFee = price - np.maximum(price - avgPrice, 0) * feeRatio
+        gasCost = series.gasPrice[row] * 1e-9 * series.wantPerEth[row]
+
+        due = row - lastHarvest >= interval
+        if not due.any():
+            continue
+
+        interest = balance * priceWithFee - debt
+        claimed = balance * (series.govValue[row] - govMark)
+        converted, convertGas = _conversion(claimed, series.idlePrice[row], minAmountIn, params)
+        gas = gasCost * (params.harvestGas + convertGas)
+
+        # harvestTrigger counts the gov tokens at their converter quote
+        harvest = due & (interest + converted > profitFactor * gas)
+        if not harvest.any():
+            continue
+
+        govMark = np.where(harvest, series.govValue[row], govMark)
+        converted = np.where(harvest, converted, 0)
+
+        # The vault sends the profit back, the redeemed interest and the converted gov tokens are minted again
+        profit = np.where(harvest, interest, 0)
+        redeemed = np.maximum(profit, 0) / priceWithFee
+        minted = (np.maximum(profit, 0) + converted) / price
+        kept = balance - redeemed
+        balance = kept + minted
+        avgPrice = np.where(minted > 0, (kept * avgPrice + minted * price) / balance, avgPrice)
+
+        debt = debt + profit + converted
+        gasSpent = gasSpent + np.where(harvest, gas, 0)
+        lastHarvest = np.where(harvest, row, lastHarvest)
+        harvests = harvests + harvest
+
+    price = series.tokenPrice[-1]
+    priceWithFee = price - np.maximum(price - avgPrice, 0) * feeRatio
+    claimed = balance * (series.govValue[-1] - govMark)
+    converted, _ = _conversion(claimed, series.idlePrice[-1], minAmountIn, params)
+    final = balance * priceWithFee + converted - gasSpent
+
+    years = (series.timestamp[-1] - series.timestamp[0]) / SECONDS_PER_YEAR
+    return {
+        "interval": interval,
+        "profitFactor": profitFactor,
+        "minAmountIn": minAmountIn,
+        "harvests": harvests,
+        "gasSpent": gasSpent,
+        # Gas can cost more than the whole position, that is a -100% APY
+        "apy": (np.maximum(final, 0) / params.deposit) ** (1 / years) - 1,
+    }
+
+
+def main(seriesPath: str, outPath: str = "", top: int = 10):
+    series = Series.load(seriesPath)
+    period = (series.timestamp[-1] - series.timestamp[0]) / (len(series) - 1)
+
+    # Every hour up to a month between harvests, see sweep for the parameters
+    hours = max(1, round(3600 / period))
+    intervals = np.arange(hours, max(hours, round(30 * 86400 / period)) + 1, hours)
+    result = sweep(
+        series,
+        intervals,
+        profitFactors=(0, 1, 10, 100),
+        minAmountsIn=(0, 100, 1_000, 10_000),
+    )
+
+    order = np.argsort(result["apy"])[::-1]
+    print(f"{len(order)} settings over {len(series)} rows")
+    print(f"{'interval (h)':>12} {'profitFactor':>12} {'minAmountIn':>11} {'harvests':>8} {'gas':>12} {'apy':>8}")
+    for i in order[: int(top)]:
+        print(
+            f"{result['interval'][i] * period / 3600:>12.1f} {result['profitFactor'][i]:>12g}"
+            f" {result['minAmountIn'][i]:>11g} {result['harvests'][i]:>8d}"
+            f" {result['gasSpent'][i]:>12.2f} {result['apy'][i]:>8.4%}"
+        )
+
+    if outPath:
+        with open(outPath, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(result.keys())
+            writer.writerows(zip(*result.values()))
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from brownie import network, web3
+from eth_abi import decode_abi
+from eth_utils import keccak, to_checksum_address
+
+from scripts.rpc import RpcClient, RpcError
+
+logger = logging.getLogger("indexer")
+
+HARVESTED = "0x" + keccak(text="Harvested(uint256,uint256,uint256,uint256)").hex()
+PROXY_CREATED = "0x" + keccak(text="ProxyCreated(address,bytes)").hex()
+LOG_SWAP = "0x" + keccak(text="LOG_SWAP(address,address,address,uint256,uint256)").hex()
+SWAP = "0x" + keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)").hex()
+
+# uint256 amounts don't fit SQLite integers, they are stored as decimal strings
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    address TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS harvests (
+    strategy TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    logIndex INTEGER NOT NULL,
+    profit TEXT NOT NULL,
+    loss TEXT NOT NULL,
+    debtPayment TEXT NOT NULL,
+    debtOutstanding TEXT NOT NULL,
+    gasUsed INTEGER,
+    gasPrice INTEGER,
+    PRIMARY KEY (tx, logIndex)
+);
+CREATE INDEX IF NOT EXISTS harvestsByStrategy ON harvests (strategy, block);
+CREATE INDEX IF NOT EXISTS harvestsByBlock ON harvests (block);
+CREATE TABLE IF NOT EXISTS proxies (
+    factory TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    logIndex INTEGER NOT NULL,
+    proxy TEXT NOT NULL,
+    PRIMARY KEY (tx, logIndex)
+);
+CREATE INDEX IF NOT EXISTS proxiesByBlock ON proxies (block);
+CREATE TABLE IF NOT EXISTS balancerSwaps (
+    pool TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    logIndex INTEGER NOT NULL,
+    caller TEXT NOT NULL,
+    tokenIn TEXT NOT NULL,
+    tokenOut TEXT NOT NULL,
+    amountIn TEXT NOT NULL,
+    amountOut TEXT NOT NULL,
+    PRIMARY KEY (tx, logIndex)
+);
+CREATE INDEX IF NOT EXISTS balancerSwapsByBlock ON balancerSwaps (block);
+CREATE TABLE IF NOT EXISTS uniswapSwaps (
+    pair TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    logIndex INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    amount0In TEXT NOT NULL,
+    amount1In TEXT NOT NULL,
+    amount0Out TEXT NOT NULL,
+    amount1Out TEXT NOT NULL,
+    PRIMARY KEY (tx, logIndex)
+);
+CREATE INDEX IF NOT EXISTS uniswapSwapsByRecipient ON uniswapSwaps (recipient, block);
+CREATE INDEX IF NOT EXISTS uniswapSwapsByBlock ON uniswapSwaps (block);
+"""
+
+
+@dataclass
+class Config:
+    strategies: List[str] = field(default_factory=list)
+    factories: List[str] = field(default_factory=list)
+    # Balancer pools and Uniswap V2 pairs of the converter routes
+    bpools: List[str] = field(default_factory=list)
+    pairs: List[str] = field(default_factory=list)
+    # Balancer swaps are kept when called by a converter, Uniswap swaps when sent to a converter or a
+    # strategy (the last hop of a route). Empty keeps every swap of the pools and pairs
+    converters: List[str] = field(default_factory=list)
+    database: str = "indexer.db"
+    # First block of contracts without a checkpoint
+    startBlock: int = 0
+    # Blocks behind the head left for reorgs
+    confirmations: int = 5
+    # Blocks per eth_getLogs, doubled after a success and halved when the node refuses the range
+    initialRange: int = 2_000
+    maxRange: int = 100_000
+
+    @classmethod
+    def load(cls, path: str) -> "Config":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+@dataclass
+class Source:
+    address: str
+    kind: str
+    # Last indexed block
+    block: int
+    range: int
+
+
+def _topic(address: str) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+def _address(topic: str) -> str:
+    return to_checksum_address("0x" + topic[-40:])
+
+
+def _uints(data: str, count: int) -> List[str]:
+    return [str(value) for value in decode_abi(["uint256"] * count, bytes.fromhex(data[2:]))]
+
+
+class Indexer:
+    """
+    Every round sends the next eth_getLogs of every contract behind the head in one batch, then writes the
+    decoded rows and the new checkpoints in one SQLite transaction. An interrupted run resumes from the
+    checkpoints, a rerun only fetches the new blocks.
+    """
+
+    def __init__(self, rpc: RpcClient, db: sqlite3.Connection, config: Config):
+        self.rpc = rpc
+        self.db = db
+        self.config = config
+        self.db.executescript(SCHEMA)
+
+        self.sources: List[Source] = []
+        for kind in ("strategies", "factories", "bpools", "pairs"):
+            for address in getattr(config, kind):
+                self.sources.append(self._source(to_checksum_address(address), kind))
+
+        converters = [_topic(converter) for converter in config.converters]
+        recipients = converters + [_topic(strategy) for strategy in config.strategies] if converters else []
+        self.topics: Dict[str, list] = {
+            "strategies": [HARVESTED],
+            "factories": [PROXY_CREATED],
+            "bpools": [LOG_SWAP, converters] if converters else [LOG_SWAP],
+            "pairs": [SWAP, None, recipients] if recipients else [SWAP],
+        }
+
+    def _source(self, address: str, kind: str) -> Source:
+        row = self.db.execute("SELECT block FROM checkpoints WHERE address = ?", (address,)).fetchone()
+        block = row[0] if row else self.config.startBlock - 1
+        return Source(address, kind, block, self.config.initialRange)
+
+    async def sync(self) -> int:
+        """Index every contract up to the head minus the confirmations, returns the number of new rows"""
+        head = int(await self.rpc.call("eth_blockNumber"), 16) - self.config.confirmations
+        rows = 0
+        while True:
+            behind = [source for source in self.sources if source.block < head]
+            if not behind:
+                return rows
+
+            ranges = [(source.block + 1, min(source.block + source.range, head)) for source in behind]
+            results = await self.rpc.batch(
+                [
+                    (
+                        "eth_getLogs",
+                        [
+                            {
+                                "address": source.address,
+                                "fromBlock": hex(fromBlock),
+                                "toBlock": hex(toBlock),
+                                "topics": self.topics[source.kind],
+                            }
+                        ],
+                    )
+                    for source, (fromBlock, toBlock) in zip(behind, ranges)
+                ]
+            )
+
+            logs = []
+            done = []
+            for source, (fromBlock, toBlock), result in zip(behind, ranges, results):
+                if isinstance(result, RpcError):
+                    if toBlock == fromBlock:
+                        raise result
+                    # Too many results or a range over the node limit
+                    source.range = max(1, (toBlock - fromBlock + 1) // 2)
+                    logger.info("%s: %s, range down to %d blocks", source.address, result, source.range)
+                    continue
+                logs.extend((source, log) for log in result)
+                done.append((source, toBlock))
+
+            rows += await self._write(logs, done)
+
+    async def _write(self, logs: Sequence, done: Sequence) -> int:
+        harvests = [log for source, log in logs if source.kind == "strategies"]
+        costs = await self._costs({log["transactionHash"] for log in harvests})
+
+        with self.db:
+            for source, log in logs:
+                self._insert(source, log, costs)
+            for source, toBlock in done:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO checkpoints (address, kind, block) VALUES (?, ?, ?)",
+                    (source.address, source.kind, toBlock),
+                )
+
+        for source, toBlock in done:
+            source.block = toBlock
+            source.range = min(source.range * 2, self.config.maxRange)
+        return len(logs)
+
+    async def _costs(self, txHashes) -> Dict[str, tuple]:
+        """Gas used and gas price of every harvest transaction"""
+        txHashes = sorted(txHashes)
+        calls = []
+        for txHash in txHashes:
+            calls.extend((("eth_getTransactionReceipt", [txHash]), ("eth_getTransactionByHash", [txHash])))
+        results = await self.rpc.batch(calls)
+        costs = {}
+        for txHash, receipt, tx in zip(txHashes, results[::2], results[1::2]):
+            if isinstance(receipt, RpcError) or isinstance(tx, RpcError) or receipt is None:
+                costs[txHash] = (None, None)
+                continue
+            # effectiveGasPrice is only in post London receipts
+            gasPrice = receipt.get("effectiveGasPrice") or tx["gasPrice"]
+            costs[txHash] = (int(receipt["gasUsed"], 16), int(gasPrice, 16))
+        return costs
+
+    def _insert(self, source: Source, log: dict, costs: Dict[str, tuple]) -> None:
+        topics, data = log["topics"], log["data"]
+        common = (source.address, int(log["blockNumber"], 16), log["transactionHash"], int(log["logIndex"], 16))
+
+        if source.kind == "strategies":
+            self.db.execute(
+                "INSERT OR IGNORE INTO harvests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*common, *_uints(data, 4), *costs[log["transactionHash"]]),
+            )
+        elif source.kind == "factories":
+            self.db.execute("INSERT OR IGNORE INTO proxies VALUES (?, ?, ?, ?, ?)", (*common, _address(topics[1])))
+        elif source.kind == "bpools":
+            self.db.execute(
+                "INSERT OR IGNORE INTO balancerSwaps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*common, _address(topics[1]), _address(topics[2]), _address(topics[3]), *_uints(data, 2)),
+            )
+        else:
+            self.db.execute(
+                "INSERT OR IGNORE INTO uniswapSwaps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*common, _address(topics[1]), _address(topics[2]), *_uints(data, 4)),
+            )
+
+
+async def index(url: str, config: Config, db: Optional[sqlite3.Connection] = None) -> int:
+    db = db or sqlite3.connect(config.database)
+    async with RpcClient(url) as rpc:
+        return await Indexer(rpc, db, config).sync()
+
+
+def main(configPath: str = "indexer.json"):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(f"You are using the '{network.show_active()}' network")
+
+    config = Config.load(configPath)
+    rows = asyncio.run(index(web3.provider.endpoint_uri, config))
+    print(f"{rows} new rows in {config.database}")
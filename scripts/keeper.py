@@ -0,0 +1,315 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from brownie import accounts, network, web3
+from eth_abi import encode_single
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+from scripts.rpc import RpcClient, RpcError
+
+logger = logging.getLogger("keeper")
+
+HARVEST_TRIGGER = function_signature_to_4byte_selector("harvestTrigger(uint256)")
+TEND_TRIGGER = function_signature_to_4byte_selector("tendTrigger(uint256)")
+HARVEST = "0x" + function_signature_to_4byte_selector("harvest()").hex()
+TEND = "0x" + function_signature_to_4byte_selector("tend()").hex()
+
+
+@dataclass
+class Config:
+    strategies: List[str]
+    # brownie account ids, see `brownie accounts list`
+    accounts: List[str] = field(default_factory=list)
+    # Seconds between two poll cycles
+    interval: float = 15
+    # Gas limit of harvest/tend
+    txGas: int = 2_000_000
+    # Gas a harvest/tend is expected to use, prices the call cost passed to the triggers
+    expectedGas: int = 600_000
+    maxGasPrice: int = 300 * 10 ** 9
+    # A transaction not mined after replaceAfter seconds is resent with the same nonce
+    # and a gas price bumped by replaceBump, up to maxReplacements times
+    replaceAfter: float = 180
+    replaceBump: float = 1.125
+    maxReplacements: int = 5
+
+    @classmethod
+    def load(cls, path: str) -> "Config":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+@dataclass
+class KeeperAccount:
+    address: str
+    # None when the node holds the key (unlocked accounts, e.g. ganache)
+    privateKey: Optional[str] = None
+    nonce: int = 0
+
+
+@dataclass
+class PendingTx:
+    strategy: str
+    data: str
+    account: KeeperAccount
+    nonce: int
+    gasPrice: int
+    sentAt: float
+    # Every hash sent for this nonce, any of them can be mined
+    hashes: List[str] = field(default_factory=list)
+    replacements: int = 0
+
+
+def _decodeBool(result) -> bool:
+    if isinstance(result, RpcError):
+        raise result
+    # An account without code returns "0x"
+    if not isinstance(result, str) or len(result) != 66:
+        raise ValueError(f"not a bool: {result!r}")
+    return int(result, 16) != 0
+
+
+class GasTracker:
+    """
+    Node gas price, smoothed for the call cost passed to the triggers
+    so a single spiky block doesn't trigger or delay a whole fleet
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latest: Optional[int] = None
+        self.smoothed: Optional[int] = None
+
+    def update(self, gasPrice: int) -> None:
+        self.latest = gasPrice
+        if self.smoothed is None:
+            self.smoothed = gasPrice
+        else:
+            self.smoothed = int(self.alpha * gasPrice + (1 - self.alpha) * self.smoothed)
+
+    def bid(self, maxGasPrice: int) -> int:
+        return min(self.latest, maxGasPrice)
+
+
+class AccountPool:
+    """Accounts with their next nonce, an account has at most one pending transaction"""
+
+    def __init__(self, keeperAccounts: Sequence[KeeperAccount]):
+        self.accounts = list(keeperAccounts)
+        self._free = deque(self.accounts)
+
+    async def sync(self, rpc: RpcClient) -> None:
+        nonces = await rpc.batch(
+            [("eth_getTransactionCount", [account.address, "pending"]) for account in self.accounts]
+        )
+        for account, nonce in zip(self.accounts, nonces):
+            if isinstance(nonce, RpcError):
+                raise nonce
+            account.nonce = int(nonce, 16)
+
+    def acquire(self) -> Optional[KeeperAccount]:
+        return self._free.popleft() if self._free else None
+
+    def release(self, account: KeeperAccount) -> None:
+        self._free.append(account)
+
+
+class Keeper:
+    """
+    Every cycle is a single batched round trip to read the gas price, the triggers of
+    every strategy and the receipts of pending transactions, followed by one batch
+    with the new and replacement transactions. Cycle latency doesn't depend on the fleet size.
+    """
+
+    def __init__(
+        self,
+        rpc: RpcClient,
+        config: Config,
+        keeperAccounts: Sequence[KeeperAccount],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rpc = rpc
+        self.config = config
+        self.strategies = [to_checksum_address(strategy) for strategy in config.strategies]
+        self.pool = AccountPool(keeperAccounts)
+        self.gas = GasTracker()
+        self.clock = clock
+        self.chainId: Optional[int] = None
+        # Strategy => its in flight harvest or tend
+        self.pending: Dict[str, PendingTx] = {}
+
+    async def setup(self) -> None:
+        chainId, gasPrice = await self.rpc.batch([("eth_chainId", []), ("eth_gasPrice", [])])
+        self.chainId = int(chainId, 16)
+        self.gas.update(int(gasPrice, 16))
+        await self.pool.sync(self.rpc)
+
+    async def run(self) -> None:
+        await self.setup()
+        while True:
+            start = self.clock()
+            try:
+                await self.cycle()
+            except Exception:
+                logger.exception("Cycle failed")
+            await asyncio.sleep(max(0, self.config.interval - (self.clock() - start)))
+
+    async def cycle(self) -> None:
+        callCost = self.gas.smoothed * self.config.expectedGas
+        pending = list(self.pending.values())
+
+        calls = [("eth_gasPrice", [])]
+        for strategy in self.strategies:
+            calls.append(self._triggerCall(strategy, HARVEST_TRIGGER, callCost))
+            calls.append(self._triggerCall(strategy, TEND_TRIGGER, callCost))
+        for tx in pending:
+            calls.extend(("eth_getTransactionReceipt", [txHash]) for txHash in tx.hashes)
+            calls.append(("eth_getTransactionCount", [tx.account.address, "latest"]))
+
+        results = await self.rpc.batch(calls)
+
+        if not isinstance(results[0], RpcError):
+            self.gas.update(int(results[0], 16))
+
+        offset = 1 + 2 * len(self.strategies)
+        for tx in pending:
+            receipts = results[offset : offset + len(tx.hashes)]
+            latestNonce = results[offset + len(tx.hashes)]
+            offset += len(tx.hashes) + 1
+            self._checkPending(tx, receipts, latestNonce)
+
+        sends = []
+        for tx in list(self.pending.values()):
+            if self._shouldReplace(tx):
+                sends.append(self._replace(tx))
+
+        for i, strategy in enumerate(self.strategies):
+            if strategy in self.pending:
+                continue
+
+            try:
+                harvest, tend = _decodeBool(results[1 + 2 * i]), _decodeBool(results[2 + 2 * i])
+            except (RpcError, ValueError) as e:
+                # One broken strategy doesn't stop the others
+                logger.warning("%s: trigger failed (%s)", strategy, e)
+                continue
+
+            data = HARVEST if harvest else TEND if tend else None
+            if data is None:
+                continue
+
+            account = self.pool.acquire()
+            if account is None:
+                logger.info("No free account, %s postponed to the next cycle", strategy)
+                break
+
+            tx = PendingTx(strategy, data, account, account.nonce, self.gas.bid(self.config.maxGasPrice), self.clock())
+            account.nonce += 1
+            self.pending[strategy] = tx
+            sends.append(tx)
+
+        if sends:
+            await self._send(sends)
+
+    def _triggerCall(self, strategy: str, selector: bytes, callCost: int):
+        data = "0x" + (selector + encode_single("uint256", callCost)).hex()
+        return "eth_call", [{"to": strategy, "data": data}, "latest"]
+
+    def _checkPending(self, tx: PendingTx, receipts: list, latestNonce) -> None:
+        receipt = next((r for r in receipts if r and not isinstance(r, RpcError)), None)
+        if receipt is not None:
+            status = int(receipt["status"], 16)
+            logger.log(
+                logging.INFO if status else logging.ERROR,
+                "%s: %s %s in block %d",
+                tx.strategy,
+                self._method(tx),
+                "mined" if status else "reverted",
+                int(receipt["blockNumber"], 16),
+            )
+            self._done(tx)
+        elif not isinstance(latestNonce, RpcError) and int(latestNonce, 16) > tx.nonce:
+            # The nonce was used by a transaction we don't know about
+            logger.warning("%s: nonce %d of %s used elsewhere", tx.strategy, tx.nonce, tx.account.address)
+            self._done(tx)
+
+    def _done(self, tx: PendingTx) -> None:
+        del self.pending[tx.strategy]
+        self.pool.release(tx.account)
+
+    def _shouldReplace(self, tx: PendingTx) -> bool:
+        return (
+            bool(tx.hashes)
+            and self.clock() - tx.sentAt >= self.config.replaceAfter
+            and tx.replacements < self.config.maxReplacements
+            and tx.gasPrice < self.config.maxGasPrice
+        )
+
+    def _replace(self, tx: PendingTx) -> PendingTx:
+        # Nodes only accept a replacement above the bumped price
+        tx.gasPrice = min(
+            max(int(tx.gasPrice * self.config.replaceBump) + 1, self.gas.bid(self.config.maxGasPrice)),
+            self.config.maxGasPrice,
+        )
+        tx.replacements += 1
+        tx.sentAt = self.clock()
+        logger.info("%s: replacing nonce %d at %d wei", tx.strategy, tx.nonce, tx.gasPrice)
+        return tx
+
+    async def _send(self, sends: Sequence[PendingTx]) -> None:
+        results = await self.rpc.batch([self._sendCall(tx) for tx in sends])
+        for tx, result in zip(sends, results):
+            if not isinstance(result, RpcError):
+                tx.hashes.append(result)
+                logger.info("%s: %s sent %s", tx.strategy, self._method(tx), result)
+                continue
+
+            logger.error("%s: %s failed (%s)", tx.strategy, self._method(tx), result)
+            if not tx.hashes:
+                # Nothing went out with this nonce, sync it in case it was the cause
+                self._done(tx)
+                await self.pool.sync(self.rpc)
+
+    def _sendCall(self, tx: PendingTx):
+        transaction = {
+            "to": tx.strategy,
+            "data": tx.data,
+            "value": 0,
+            "nonce": tx.nonce,
+            "gas": self.config.txGas,
+            "gasPrice": tx.gasPrice,
+        }
+        if tx.account.privateKey is None:
+            transaction = {key: hex(value) if isinstance(value, int) else value for key, value in transaction.items()}
+            return "eth_sendTransaction", [{"from": tx.account.address, **transaction}]
+
+        signed = Account.sign_transaction({**transaction, "chainId": self.chainId}, tx.account.privateKey)
+        return "eth_sendRawTransaction", [signed.rawTransaction.hex()]
+
+    def _method(self, tx: PendingTx) -> str:
+        return "harvest" if tx.data == HARVEST else "tend"
+
+
+async def _run(url: str, config: Config, keeperAccounts: Sequence[KeeperAccount]) -> None:
+    async with RpcClient(url) as rpc:
+        await Keeper(rpc, config, keeperAccounts).run()
+
+
+def main(configPath: str = "keeper.json"):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(f"You are using the '{network.show_active()}' network")
+
+    config = Config.load(configPath)
+    keeperAccounts = []
+    for accountId in config.accounts:
+        account = accounts.load(accountId)
+        keeperAccounts.append(KeeperAccount(account.address, account.private_key))
+    print(f"Keeping {len(config.strategies)} strategies with {len(keeperAccounts)} accounts")
+
+    asyncio.run(_run(web3.provider.endpoint_uri, config, keeperAccounts))
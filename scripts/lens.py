@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from brownie import StrategyIdleLens, accounts, network
+from eth_utils import is_checksum_address
+
+# Mainnet IdleController, source of idleAccrued
+IDLE_CONTROLLER = "0x275DA8e61ea8E02d51EDd8d0DC5c0E62b4CDB0BE"
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    performanceFee: int
+    activation: int
+    debtRatio: int
+    minDebtPerHarvest: int
+    maxDebtPerHarvest: int
+    lastReport: int
+    totalDebt: int
+    totalGain: int
+    totalLoss: int
+
+
+@dataclass(frozen=True)
+class StrategySnapshot:
+    strategy: str
+    ok: bool
+    vault: str
+    want: str
+    idleYieldToken: str
+    estimatedTotalAssets: int
+    tokenPrice: int
+    lastVirtualPrice: int
+    balanceOfWant: int
+    idleTokenBalance: int
+    idleAccrued: int
+    govTokens: List[str]
+    govTokenBalances: List[int]
+    params: StrategyParams
+
+    @classmethod
+    def decode(cls, value: Sequence) -> "StrategySnapshot":
+        # Field order follows StrategyIdleLens.Snapshot
+        *fields, govTokens, govTokenBalances, params = value
+        return cls(
+            *fields,
+            govTokens=list(govTokens),
+            govTokenBalances=list(govTokenBalances),
+            params=StrategyParams(*params),
+        )
+
+    @property
+    def govTokenBalanceOf(self) -> dict:
+        return dict(zip(self.govTokens, self.govTokenBalances))
+
+
+def snapshots(lens, strategies: Sequence[str]) -> List[StrategySnapshot]:
+    """One eth_call for every strategy"""
+    return [StrategySnapshot.decode(value) for value in lens.snapshots(strategies)]
+
+
+def deploy(idleController: str = IDLE_CONTROLLER):
+    dev = accounts.load("dev")
+    return StrategyIdleLens.deploy(idleController, {"from": dev})
+
+
+def main(lensAddress: str, *strategies: str):
+    print(f"You are using the '{network.show_active()}' network")
+    for address in (lensAddress, *strategies):
+        assert is_checksum_address(address), f"'{address}' is not a checksummed address"
+
+    lens = StrategyIdleLens.at(lensAddress)
+    for snapshot in snapshots(lens, strategies):
+        if not snapshot.ok:
+            print(f"{snapshot.strategy}: unreadable")
+            continue
+
+        print(
+            f"""
+    {snapshot.strategy}
+         vault: {snapshot.vault}
+  total assets: {snapshot.estimatedTotalAssets}
+    total debt: {snapshot.params.totalDebt}
+   token price: {snapshot.tokenPrice} (last {snapshot.lastVirtualPrice})
+          want: {snapshot.balanceOfWant}
+  idle accrued: {snapshot.idleAccrued}
+    gov tokens: {snapshot.govTokenBalanceOf}
+    """
+        )
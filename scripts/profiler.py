@@ -0,0 +1,118 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from brownie import chain, network
+
+CALL_OPS = {"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL", "CREATE", "CREATE2"}
+# Gas outside of the opcodes: the 21000 base cost, calldata and storage refunds
+INTRINSIC = "[intrinsic and refunds]"
+
+
+@dataclass
+class FrameStats:
+    # Gas of the frame's own opcodes, and of the frame with everything it calls
+    selfGas: int = 0
+    inclusiveGas: int = 0
+
+
+@dataclass
+class Profile:
+    gasUsed: int
+    # Call path (root first) => gas of the opcodes run in its last frame
+    stacks: Dict[Tuple[str, ...], int] = field(default_factory=dict)
+
+    @property
+    def frames(self) -> Dict[str, FrameStats]:
+        frames = defaultdict(FrameStats)
+        for path, gas in self.stacks.items():
+            frames[path[-1]].selfGas += gas
+            # A recursive frame counts once per path
+            for frame in set(path):
+                frames[frame].inclusiveGas += gas
+        return dict(frames)
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, the input of flamegraph.pl and speedscope"""
+        return "".join(f"{';'.join(path)} {gas}\n" for path, gas in sorted(self.stacks.items()) if gas > 0)
+
+    def summary(self, top: int = 30) -> str:
+        frames = sorted(self.frames.items(), key=lambda item: item[1].inclusiveGas, reverse=True)
+        lines = [f"{'frame':<60} {'inclusive':>10} {'%':>6} {'self':>10}"]
+        for name, stats in frames[:top]:
+            share = stats.inclusiveGas / self.gasUsed
+            lines.append(f"{name[:60]:<60} {stats.inclusiveGas:>10} {share:>6.1%} {stats.selfGas:>10}")
+        return "\n".join(lines)
+
+
+def _frameName(step: dict) -> str:
+    # Brownie names steps of known contracts "Contract.function", internal functions included
+    return step.get("fn") or step.get("address") or "<unknown>"
+
+
+def profile(tx) -> Profile:
+    """
+    Attribute the gas of every opcode in the trace of a brownie TransactionReceipt to its call path.
+    External calls are frames by depth, internal functions by brownie's jump depth.
+    A CALL is charged to the caller minus what the callee spent, so every gas unit is counted once.
+    """
+    trace = tx.trace
+    stacks = defaultdict(int)
+    rootDepth = trace[0]["depth"] if trace else 0
+
+    # frames[depth] is the internal function stack of the external call at that depth
+    frames: List[List[str]] = []
+    # CALL steps waiting for their callee: (depth, gas, spent, path)
+    pending: List[tuple] = []
+    spent = 0
+
+    for i, step in enumerate(trace):
+        depth = step["depth"] - rootDepth
+        name = _frameName(step)
+
+        del frames[depth + 1 :]
+        if depth == len(frames):
+            frames.append([])
+        internal = frames[depth]
+        jumpDepth = step.get("jumpDepth", 0)
+        del internal[jumpDepth + 1 :]
+        if len(internal) <= jumpDepth:
+            internal.append(name)
+        elif internal[-1] != name:
+            internal[-1] = name
+        path = tuple(frame for call in frames for frame in call)
+
+        # Back from a callee: the caller pays what the CALL cost minus what the callee spent
+        while pending and pending[-1][0] >= depth:
+            _, gas, spentBefore, callPath = pending.pop()
+            cost = gas - step["gas"] - (spent - spentBefore)
+            stacks[callPath] += cost
+            spent += cost
+
+        following = trace[i + 1] if i + 1 < len(trace) else None
+        if following is not None and following["depth"] - rootDepth > depth and step["op"] in CALL_OPS:
+            pending.append((depth, step["gas"], spent, path))
+            continue
+
+        # The gas difference also covers calls without code (precompiles, EOAs)
+        if following is not None and following["depth"] - rootDepth == depth:
+            cost = step["gas"] - following["gas"]
+        else:
+            cost = step["gasCost"]
+        stacks[path] += cost
+        spent += cost
+
+    # Also absorbs calls the trace ends in (out of gas)
+    stacks[(INTRINSIC,)] += tx.gas_used - spent
+    return Profile(tx.gas_used, dict(stacks))
+
+
+def main(txHash: str, outPath: str = "profile.folded"):
+    print(f"You are using the '{network.show_active()}' network")
+
+    result = profile(chain.get_transaction(txHash))
+    with open(outPath, "w") as f:
+        f.write(result.collapsed())
+
+    print(result.summary())
+    print(f"\n{result.gasUsed} gas, collapsed stacks in {outPath}")
@@ -0,0 +1,70 @@
+import asyncio
+import itertools
+from typing import Any, List, Sequence, Tuple
+
+import aiohttp
+
+# Nodes limit the size of a JSON-RPC batch, bigger batches are split and sent concurrently
+MAX_BATCH_SIZE = 100
+
+
+class RpcError(Exception):
+    def __init__(self, method: str, error: dict):
+        super().__init__(f"{method}: {error.get('message', error)}")
+        self.method = method
+        self.error = error
+
+
+class RpcClient:
+    """
+    Minimal async JSON-RPC client. `batch` sends many calls in one HTTP round trip,
+    a failed call is returned as its `RpcError` instead of failing the whole batch.
+    """
+
+    def __init__(self, url: str, timeout: float = 30, maxBatchSize: int = MAX_BATCH_SIZE):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.maxBatchSize = maxBatchSize
+        self._ids = itertools.count()
+        self._session = None
+
+    async def __aenter__(self) -> "RpcClient":
+        self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def call(self, method: str, params: Sequence = ()) -> Any:
+        [result] = await self.batch([(method, params)])
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    async def batch(self, calls: Sequence[Tuple[str, Sequence]]) -> List[Any]:
+        chunks = [calls[i : i + self.maxBatchSize] for i in range(0, len(calls), self.maxBatchSize)]
+        results = await asyncio.gather(*[self._batch(chunk) for chunk in chunks])
+        return [result for chunk in results for result in chunk]
+
+    async def _batch(self, calls: Sequence[Tuple[str, Sequence]]) -> List[Any]:
+        requests = [
+            {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": list(params)}
+            for method, params in calls
+        ]
+        async with self._session.post(self.url, json=requests) as response:
+            response.raise_for_status()
+            body = await response.json()
+
+        # Nodes answer a batch they refuse (rate limit, batch too large) with a single error object
+        if not isinstance(body, list):
+            error = body.get("error", body) if isinstance(body, dict) else {"message": repr(body)}
+            return [RpcError(request["method"], error) for request in requests]
+
+        # Responses of a batch can come back in any order
+        responses = {item.get("id"): item for item in body if isinstance(item, dict)}
+        results = []
+        for request in requests:
+            item = responses.get(request["id"], {"error": {"message": "no response"}})
+            results.append(RpcError(request["method"], item["error"]) if "error" in item else item.get("result"))
+        return results
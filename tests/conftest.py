@@ -1,27 +1,240 @@
+import json
+import warnings
+from pathlib import Path
+
 import pytest
 from brownie import config, Wei
 
-@pytest.fixture
+from scripts.profiler import profile
+
+# Local (mock) mode: symbol => (decimals, price in USD)
+MOCK_TOKENS = {
+    "DAI": (18, 1),
+    "SUSD": (18, 1),
+    "USDC": (6, 1),
+    "WBTC": (8, 40_000),
+    "USDT": (6, 1),
+    "TUSD": (18, 1),
+}
+MOCK_WETH_PRICE = 2_000
+MOCK_COMP_PRICE = 400
+MOCK_IDLE_PRICE = 5
+# Pool depth in USD for each side of the mock pools
+MOCK_POOL_DEPTH = 50_000_000
+# Gov tokens accrued per block for each 1e18 IdleTokens held
+MOCK_COMP_RATE = 10 ** 12
+MOCK_IDLE_RATE = 10 ** 14
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--mocks",
+        action="store_true",
+        default=False,
+        help="deploy mock Idle, Uniswap and Balancer contracts instead of using mainnet-fork state",
+    )
+    parser.addoption(
+        "--gas-baseline",
+        default=str(Path(__file__).parent.joinpath("gas-baseline.json")),
+        help="gas baseline file used by the gas benchmarks",
+    )
+    parser.addoption(
+        "--gas-tolerance",
+        type=float,
+        default=2.0,
+        help="max gas increase over the baseline, in percent, before a benchmark fails",
+    )
+    parser.addoption(
+        "--update-gas-baseline",
+        action="store_true",
+        default=False,
+        help="write the measured gas of the benchmarks to the baseline file",
+    )
+    parser.addoption(
+        "--gas-profile",
+        default=None,
+        help="directory where the call trace gas of every benchmarked transaction is written as collapsed stacks",
+    )
+    parser.addoption(
+        "--load-accounts",
+        type=int,
+        default=200,
+        help="depositors of the stateful load test",
+    )
+    parser.addoption(
+        "--load-runs",
+        type=int,
+        default=5,
+        help="runs of the stateful load test, the chain is reverted between runs",
+    )
+    parser.addoption(
+        "--load-steps",
+        type=int,
+        default=100,
+        help="max operations per run of the stateful load test",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "mainnet: test needs mainnet-fork state, skipped with --mocks")
+    config.addinivalue_line("markers", "mocks: test needs the mock protocols, skipped without --mocks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--mocks"):
+        skip = pytest.mark.skip(reason="needs mainnet-fork state")
+        marker = "mainnet"
+    else:
+        skip = pytest.mark.skip(reason="needs --mocks")
+        marker = "mocks"
+
+    for item in items:
+        if marker in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    # With `-n`, brownie starts one chain per worker (port offset by worker id).
+    # Group tests by token parameter so each worker only deploys the session
+    # fixtures of the tokens it runs, instead of every worker deploying all six.
+    from xdist.scheduler import LoadScopeScheduling
+
+    class TokenScheduling(LoadScopeScheduling):
+        def _split_scope(self, nodeid):
+            # tests/test_operation.py::test_empty_vault[USDC] => USDC
+            if nodeid.endswith("]"):
+                for param in nodeid[nodeid.rindex("[") + 1 : -1].split("-"):
+                    if param in MOCK_TOKENS:
+                        return param
+            return super()._split_scope(nodeid)
+
+    return TokenScheduling(config, log)
+
+
+def immutableArgsOf(*addresses):
+    # abi.encodePacked of addresses
+    return "0x" + "".join(str(address)[2:] for address in addresses)
+
+
+def minGovTokenRatesOf(converter, govTokens, want):
+    # Keeper floors, 10% under the converter quote so the price moves of a test still convert
+    return [converter.getAmountOut(10 ** 18, govToken, want) * 90 // 100 for govToken in govTokens]
+
+
+def mockAmount(usd, price, decimals=18):
+    return int(usd * 10 ** decimals / price)
+
+
+class GasBenchmark:
+    """
+    Gas used per benchmarked call, grouped by token. Measurements are checked
+    against the baseline file and written to it with --update-gas-baseline.
+    With --gas-profile, transactions are also profiled, see scripts/profiler.py.
+    """
+
+    def __init__(self, path, tolerance, update, profileDir=None):
+        self.path = Path(path)
+        self.tolerance = tolerance
+        self.update = update
+        self.profileDir = Path(profileDir) if profileDir else None
+        self.baseline = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.results = {}
+        self.warned = False
+
+    def record(self, group, name, tx):
+        # A transaction or the total gas of several ones
+        gasUsed = tx if isinstance(tx, int) else tx.gas_used
+        self.results.setdefault(group, {})[name] = gasUsed
+
+        if self.profileDir is not None and not isinstance(tx, int):
+            self.profileDir.mkdir(parents=True, exist_ok=True)
+            fileName = f"{group}-{name}".replace("/", "-")
+            self.profileDir.joinpath(f"{fileName}.folded").write_text(profile(tx).collapsed())
+
+        if self.update:
+            return gasUsed
+
+        if not self.baseline:
+            # Not recorded yet (e.g. the CI gas job records it), the relative checks of the benchmarks still run
+            if not self.warned:
+                warnings.warn(f"no gas baseline in {self.path}, record it with --update-gas-baseline")
+                self.warned = True
+            return gasUsed
+
+        # A missing entry fails, a benchmark without a baseline checks nothing
+        expected = self.baseline.get(group, {}).get(name)
+        assert expected is not None, f"{group} {name}: no baseline in {self.path}, run with --update-gas-baseline"
+        limit = expected * (100 + self.tolerance) / 100
+        assert gasUsed <= limit, f"{group} {name}: {gasUsed} gas, baseline {expected} (+{self.tolerance}% allowed)"
+        return gasUsed
+
+    def save(self):
+        # Merge with the file on disk, xdist workers only own the groups of their tokens
+        baseline = json.loads(self.path.read_text()) if self.path.exists() else {}
+        for group, results in self.results.items():
+            baseline.setdefault(group, {}).update(results)
+        self.path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def mocks(pytestconfig):
+    yield pytestconfig.getoption("--mocks")
+
+
+@pytest.fixture(scope="session")
+def gasBenchmark(pytestconfig):
+    benchmark = GasBenchmark(
+        pytestconfig.getoption("--gas-baseline"),
+        pytestconfig.getoption("--gas-tolerance"),
+        pytestconfig.getoption("--update-gas-baseline"),
+        pytestconfig.getoption("--gas-profile"),
+    )
+    yield benchmark
+    if benchmark.update:
+        benchmark.save()
+
+
+# Deployments below are session-scoped (once per token parameter), every test
+# runs on top of them inside a chain snapshot that is reverted afterwards.
+# NOTE: brownie's fn_isolation pulls in module_isolation, whose chain.reset() at
+# every module boundary would wipe the session deployments
+@pytest.fixture(scope="session", autouse=True)
+def freshChain(chain):
+    chain.reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def isolation(chain):
+    # Session fixtures requested by the test are set up before, so they are in the snapshot
+    chain.snapshot()
+    yield
+    chain.revert()
+
+
+@pytest.fixture(scope="session")
 def gov(accounts):
     # yearn multis... I mean YFI governance. I swear!
     yield accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(gov):
     yield gov  # TODO: Add rewards contract
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     # YFI Whale, probably
     yield accounts[2]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def proxyFactoryInitializable(accounts, ProxyFactoryInitializable):
     yield accounts[0].deploy(ProxyFactoryInitializable)
 
 @pytest.fixture(
+    scope="session",
     params=[
         "DAI",
         "SUSD",
@@ -31,51 +244,118 @@ def proxyFactoryInitializable(accounts, ProxyFactoryInitializable):
         "TUSD",
     ]
 )
-def token(Token, request):
-    tokens = {
-        "DAI":  "0x6B175474E89094C44Da98b954EedeAC495271d0F",
-        "SUSD": "0x57Ab1ec28D129707052df4dF418D58a2D46d5f51",
-        "USDC": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
-        "WBTC": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",
-        "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",
-        "TUSD": "0x0000000000085d4780B73119b644AE5ecd22b376",
-    }
-    yield Token.at(tokens[request.param])
-
-@pytest.fixture
-def comp(Token):
-    yield Token.at("0xc00e94Cb662C3520282E6f5717214004A7f26888")
-
-@pytest.fixture
-def idle(Token):
-    yield Token.at("0x875773784Af8135eA0ef43b5a374AaD105c5D39e")
-
-@pytest.fixture
-def uniswap(Contract):
-    yield Contract("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D")
-
-@pytest.fixture
-def weth(Contract):
-    yield Contract("0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2")
-
-@pytest.fixture
-def bpool(Contract):
-    yield Contract("0xCaf467DFE064a1F54e4ece8515Ddf326B9bE801E")
-
-@pytest.fixture
-def idleToken(interface, token):
-    idleTokens = {
-        "0x6B175474E89094C44Da98b954EedeAC495271d0F" : "0x3fE7940616e5Bc47b0775a0dccf6237893353bB4",
-        "0x57Ab1ec28D129707052df4dF418D58a2D46d5f51" : "0xF52CDcD458bf455aeD77751743180eC4A595Fd3F",
-        "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48" : "0x5274891bEC421B39D23760c04A6755eCB444797C",
-        "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599" : "0x8C81121B15197fA0eEaEE1DC75533419DcfD3151",
-        "0xdAC17F958D2ee523a2206206994597C13D831ec7" : "0xF34842d05A1c888Ca02769A633DF37177415C2f8",
-        "0x0000000000085d4780B73119b644AE5ecd22b376" : "0xc278041fDD8249FE4c1Aad1193876857EEa3D68c",
-    }
-    yield interface.IIdleTokenV4(idleTokens[token.address])
+def token(Token, MockERC20, accounts, mocks, request):
+    if mocks:
+        decimals, _ = MOCK_TOKENS[request.param]
+        yield accounts[0].deploy(MockERC20, request.param, request.param, decimals)
+    else:
+        tokens = {
+            "DAI":  "0x6B175474E89094C44Da98b954EedeAC495271d0F",
+            "SUSD": "0x57Ab1ec28D129707052df4dF418D58a2D46d5f51",
+            "USDC": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+            "WBTC": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",
+            "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",
+            "TUSD": "0x0000000000085d4780B73119b644AE5ecd22b376",
+        }
+        yield Token.at(tokens[request.param])
+
+@pytest.fixture(scope="session")
+def comp(Token, MockERC20, accounts, mocks):
+    if mocks:
+        yield accounts[0].deploy(MockERC20, "Compound", "COMP", 18)
+    else:
+        yield Token.at("0xc00e94Cb662C3520282E6f5717214004A7f26888")
+
+@pytest.fixture(scope="session")
+def idle(Token, MockERC20, accounts, mocks):
+    if mocks:
+        yield accounts[0].deploy(MockERC20, "Idle", "IDLE", 18)
+    else:
+        yield Token.at("0x875773784Af8135eA0ef43b5a374AaD105c5D39e")
+
+@pytest.fixture(scope="session")
+def uniswap(Contract, MockUniswapRouter, accounts, mocks, token, weth, comp, idle):
+    if mocks:
+        router = accounts[0].deploy(MockUniswapRouter)
+        decimals, price = MOCK_TOKENS[token.symbol()]
+        wethReserve = mockAmount(MOCK_POOL_DEPTH, MOCK_WETH_PRICE)
+        router.setReserves(token, weth, mockAmount(MOCK_POOL_DEPTH, price, decimals), wethReserve)
+        router.setReserves(comp, weth, mockAmount(MOCK_POOL_DEPTH, MOCK_COMP_PRICE), wethReserve)
+        router.setReserves(idle, weth, mockAmount(MOCK_POOL_DEPTH, MOCK_IDLE_PRICE), wethReserve)
+        yield router
+    else:
+        yield Contract("0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D")
+
+@pytest.fixture(scope="session")
+def weth(Contract, MockERC20, accounts, mocks):
+    if mocks:
+        yield accounts[0].deploy(MockERC20, "Wrapped Ether", "WETH", 18)
+    else:
+        yield Contract("0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2")
+
+@pytest.fixture(scope="session")
+def bpool(Contract, MockBPool, accounts, mocks, weth, idle):
+    if mocks:
+        pool = accounts[0].deploy(MockBPool)
+        # Cheaper than Uniswap so IDLE is routed through Balancer, as on mainnet
+        pool.setSwapFee(10 ** 15)
+        pool.setBalance(idle, mockAmount(MOCK_POOL_DEPTH, MOCK_IDLE_PRICE))
+        pool.setBalance(weth, mockAmount(MOCK_POOL_DEPTH, MOCK_WETH_PRICE))
+        yield pool
+    else:
+        yield Contract("0xCaf467DFE064a1F54e4ece8515Ddf326B9bE801E")
+
+@pytest.fixture(scope="session")
+def idleToken(interface, MockIdleToken, accounts, mocks, token, comp, idle):
+    if mocks:
+        symbol = token.symbol()
+        idleToken = accounts[0].deploy(MockIdleToken, token, f"IdleToken {symbol}", f"idle{symbol}Yield")
+        idleToken.setGovTokens([comp, idle])
+        idleToken.setGovTokenRate(comp, MOCK_COMP_RATE)
+        idleToken.setGovTokenRate(idle, MOCK_IDLE_RATE)
+        yield interface.IIdleTokenV4(idleToken)
+    else:
+        idleTokens = {
+            "0x6B175474E89094C44Da98b954EedeAC495271d0F" : "0x3fE7940616e5Bc47b0775a0dccf6237893353bB4",
+            "0x57Ab1ec28D129707052df4dF418D58a2D46d5f51" : "0xF52CDcD458bf455aeD77751743180eC4A595Fd3F",
+            "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48" : "0x5274891bEC421B39D23760c04A6755eCB444797C",
+            "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599" : "0x8C81121B15197fA0eEaEE1DC75533419DcfD3151",
+            "0xdAC17F958D2ee523a2206206994597C13D831ec7" : "0xF34842d05A1c888Ca02769A633DF37177415C2f8",
+            "0x0000000000085d4780B73119b644AE5ecd22b376" : "0xc278041fDD8249FE4c1Aad1193876857EEa3D68c",
+        }
+        yield interface.IIdleTokenV4(idleTokens[token.address])
+
+@pytest.fixture(scope="session")
+def mockIdleToken(MockIdleToken, mocks, idleToken):
+    # Mock interface (price, fee and gov token accrual setters), only in local mode
+    if not mocks:
+        pytest.skip("needs --mocks")
+    yield MockIdleToken.at(idleToken.address)
+
+@pytest.fixture(scope="session")
+def idleReservoir(MockIdleReservoir, accounts, mocks):
+    if mocks:
+        yield accounts[0].deploy(MockIdleReservoir)
+    else:
+        yield "0x031f71B5369c251a6544c41CE059e6b3d61e42C6"
+
+@pytest.fixture(scope="session")
+def idleController(MockIdleController, accounts, mocks):
+    if mocks:
+        yield accounts[0].deploy(MockIdleController)
+    else:
+        yield "0x275DA8e61ea8E02d51EDd8d0DC5c0E62b4CDB0BE"
+
+@pytest.fixture(scope="session")
+def lens(StrategyIdleLens, accounts, idleController):
+    yield accounts[0].deploy(StrategyIdleLens, idleController)
+
+@pytest.fixture(scope="session")
+def aprDeposit(mocks, token):
+    if mocks:
+        yield 250 if token.symbol() == "WBTC" else 5 * 1e5
+        return
 
-@pytest.fixture
-def aprDeposit(token):
     aprDeposits = {
         "0x6B175474E89094C44Da98b954EedeAC495271d0F" : 5 * 1e5,
         "0x57Ab1ec28D129707052df4dF418D58a2D46d5f51" : 5 * 1e5,
@@ -87,8 +367,16 @@ def aprDeposit(token):
     yield aprDeposits[token.address]
 
 
-@pytest.fixture
-def tokenWhale(accounts, Contract, token):
+@pytest.fixture(scope="session")
+def tokenWhale(accounts, Contract, mocks, token):
+    user = accounts[5]
+
+    if mocks:
+        quantity = 1000 if token.symbol() == "WBTC" else 1 * 1e6
+        token.mint(user, quantity * 10 ** token.decimals(), {"from": accounts[0]})
+        yield user
+        return
+
     tokenWhalesAndQuantities = {
         "0x6B175474E89094C44Da98b954EedeAC495271d0F" : {
             "whale" : "0x40ec5b33f54e0e8a33a975908c5ba1c14e5bbbdf", # matic
@@ -116,34 +404,33 @@ def tokenWhale(accounts, Contract, token):
         },
     }
 
-    user = accounts[5]
     tokenWhaleAndQuantity = tokenWhalesAndQuantities[token.address]
-    
+
     whale = accounts.at(tokenWhaleAndQuantity["whale"], force=True)
     bal = tokenWhaleAndQuantity["quantity"] * 10 ** token.decimals()
     token.transfer(user, bal, {"from": whale})
 
     yield user
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def vault(pm, gov, rewards, guardian, token):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
     vault.initialize(token, gov, rewards, "", "")
     yield vault
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist(accounts):
     # You! Our new Strategist!
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     # This is our trusty bot!
     yield accounts[4]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def converter(strategist, Converter, uniswap, weth, bpool, idle):
     yield Converter.deploy(
         uniswap,
@@ -154,39 +441,71 @@ def converter(strategist, Converter, uniswap, weth, bpool, idle):
         {"from": strategist}
     )
 
-@pytest.fixture
-def healthCheck(Contract):
-    yield Contract('0xDDCea799fF1699e98EDF118e0629A974Df7DF012')
+@pytest.fixture(scope="session")
+def healthCheck(Contract, MockHealthCheck, accounts, mocks):
+    if mocks:
+        yield accounts[0].deploy(MockHealthCheck)
+    else:
+        yield Contract('0xDDCea799fF1699e98EDF118e0629A974Df7DF012')
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def strategy(vault, strategyFactory):
     yield strategyFactory(vault)
 
-@pytest.fixture()
-def strategyFactory(strategist, keeper, proxyFactoryInitializable, idleToken, comp, idle, weth, converter, StrategyIdle, healthCheck, gov):
-    def factory(vault, proxy=True):
+@pytest.fixture(scope="session")
+def referral():
+    yield "0x652c1c23780d1A015938dD58b4a65a5F9eFBA653"
+
+@pytest.fixture(scope="session")
+def strategyLogic(strategist, vault, idleToken, comp, idle, weth, converter, StrategyIdle, idleReservoir, referral):
+    # Logic contract shared by every proxy of this token
+    yield StrategyIdle.deploy(
+        vault,
+        [comp, idle],
+        weth,
+        idleReservoir,
+        idleToken,
+        referral,
+        converter,
+        {"from": strategist}
+    )
+
+@pytest.fixture(scope="session")
+def strategyImmutableArgsLogic(strategist, vault, idleToken, comp, idle, weth, converter, StrategyIdleImmutableArgs, idleReservoir, referral):
+    # Logic of the clones with immutable args of this token
+    yield StrategyIdleImmutableArgs.deploy(
+        vault,
+        [comp, idle],
+        weth,
+        idleReservoir,
+        idleToken,
+        referral,
+        converter,
+        {"from": strategist}
+    )
+
+@pytest.fixture(scope="session")
+def strategyFactory(strategist, keeper, proxyFactoryInitializable, strategyLogic, strategyImmutableArgsLogic, idleToken, comp, idle, weth, converter, StrategyIdle, healthCheck, idleReservoir, referral, gov):
+    def factory(vault, proxy=True, immutableArgs=False):
         onBehalfOf = strategist
         govTokens = [
             comp,
             idle,
         ]
-        idleReservoir = "0x031f71B5369c251a6544c41CE059e6b3d61e42C6"
-        referral = "0x652c1c23780d1A015938dD58b4a65a5F9eFBA653"
-
-        strategyLogic = StrategyIdle.deploy(
-            vault,
-            govTokens,
-            weth,
-            idleReservoir,
-            idleToken,
-            referral,
-            converter,
-            {"from": strategist}
-        )
-
-        strategyAddress = strategyLogic.address
-
-        if proxy:
+
+        if not proxy:
+            logic = StrategyIdle.deploy(
+                vault,
+                govTokens,
+                weth,
+                idleReservoir,
+                idleToken,
+                referral,
+                converter,
+                {"from": strategist}
+            )
+            strategyAddress = logic.address
+        else:
             data = strategyLogic.init.encode_input(
                 vault,
                 onBehalfOf,
@@ -197,10 +516,17 @@ def strategyFactory(strategist, keeper, proxyFactoryInitializable, idleToken, co
                 referral,
                 converter
             )
-            tx = proxyFactoryInitializable.deployMinimal(
-                strategyLogic,
-                data,
-                {"from": strategist})
+            if immutableArgs:
+                # weth, idleReservoir, idleYieldToken and referral are read from the clone code
+                args = immutableArgsOf(weth, idleReservoir, idleToken, referral)
+                tx = proxyFactoryInitializable.deployMinimalWithArgs(
+                    strategyImmutableArgsLogic, args, data, {"from": strategist}
+                )
+            else:
+                tx = proxyFactoryInitializable.deployMinimal(
+                    strategyLogic,
+                    data,
+                    {"from": strategist})
 
             strategyAddress = (tx.events["ProxyCreated"]["proxy"])
 
@@ -208,5 +534,13 @@ def strategyFactory(strategist, keeper, proxyFactoryInitializable, idleToken, co
         strategy.setKeeper(keeper)
         strategy.setHealthCheck(healthCheck, {"from": gov})
         strategy.setDoHealthCheck(True, {"from": gov})
+        # Gov tokens without a keeper rate are never sold
+        strategy.setMinGovTokenRates(govTokens, minGovTokenRatesOf(converter, govTokens, vault.token()), {"from": gov})
         return strategy
     yield factory
+
+@pytest.fixture(scope="session")
+def batchHarvester(strategist, keeper, BatchHarvester):
+    harvester = strategist.deploy(BatchHarvester)
+    harvester.setKeeper(keeper, True, {"from": strategist})
+    yield harvester
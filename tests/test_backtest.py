@@ -0,0 +1,60 @@
+import numpy as np
+
+from scripts.backtest import SECONDS_PER_YEAR, Params, Series, sweep
+
+
+def series(rows=24 * 365, apr=0.05, govApr=0.0, gasPrice=50.0):
+    # Hourly rows over a year, the IdleToken price compounds at `apr`
+    timestamp = np.arange(rows) * 3600.0
+    years = timestamp / SECONDS_PER_YEAR
+    return Series(
+        timestamp=timestamp,
+        tokenPrice=np.exp(apr * years),
+        govValue=govApr * years,
+        gasPrice=np.full(rows, gasPrice),
+        wantPerEth=np.full(rows, 3000.0),
+        idlePrice=np.full(rows, 5.0),
+    )
+
+
+def test_backtest_fee_and_gas():
+    # Without gas nor Idle fee, the net APY is the IdleToken one whatever the cadence
+    result = sweep(series(gasPrice=0), [1, 24, 24 * 30], params=Params(fee=0))
+    assert np.allclose(result["apy"], np.exp(0.05) - 1)
+
+    # Idle takes 10% of the gains
+    result = sweep(series(gasPrice=0), [24 * 30])
+    assert np.isclose(result["apy"][0], 0.9 * (np.exp(0.05) - 1), rtol=1e-3)
+
+    # Harvesting every hour costs more gas than it earns
+    result = sweep(series(), [1, 24 * 7])
+    assert result["harvests"][0] > result["harvests"][1]
+    assert result["apy"][0] < result["apy"][1]
+
+
+def test_backtest_thresholds():
+    intervals, profitFactors, minAmountsIn = [24], [0, 100], [0, 10 ** 9]
+    result = sweep(series(govApr=0.01), intervals, profitFactors, minAmountsIn)
+    assert len(result["apy"]) == 4
+
+    # Settings are ordered as the product of the parameters, last one varies fastest
+    assert list(result["profitFactor"]) == [0, 0, 100, 100]
+    assert list(result["minAmountIn"]) == [0, 10 ** 9, 0, 10 ** 9]
+
+    # A high profitFactor harvests less often
+    assert result["harvests"][2] < result["harvests"][0]
+    assert result["apy"][2] > result["apy"][0]
+
+    # Below minAmountIn the IDLE goes through Uniswap and saves the Balancer gas
+    assert result["harvests"][1] == result["harvests"][0]
+    assert result["gasSpent"][1] < result["gasSpent"][0]
+
+
+def test_backtest_idle_route():
+    # Without gas, Balancer's lower slippage is worth it for any amount
+    result = sweep(series(govApr=0.01, gasPrice=0), [24 * 7], minAmountsIn=[0, 10 ** 9])
+    assert result["apy"][0] > result["apy"][1]
+
+    # At 50 gwei the Balancer gas costs more than the slippage it saves on a daily harvest
+    result = sweep(series(govApr=0.01), [24], minAmountsIn=[0, 10 ** 9])
+    assert result["apy"][0] < result["apy"][1]
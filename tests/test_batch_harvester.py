@@ -0,0 +1,23 @@
+import brownie
+
+
+def test_batch_harvest(vault, strategy, strategyFactory, batchHarvester, token, tokenWhale, gov, keeper, accounts):
+    strategyNotKept = strategyFactory(vault)
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    for s in [strategy, strategyNotKept]:
+        vault.addStrategy(s, 5_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * (10 ** token.decimals()), {"from": tokenWhale})
+
+    # Only strategy has the harvester as keeper, the others revert or aren't contracts
+    strategy.setKeeper(batchHarvester, {"from": gov})
+    tx = batchHarvester.harvest([strategyNotKept, accounts[1], strategy], {"from": keeper})
+
+    assert tx.return_value == [False, False, True]
+    assert [event["strategy"] for event in tx.events["StrategyHarvested"]] == [strategyNotKept, accounts[1], strategy]
+    assert all(event["gasUsed"] > 0 for event in tx.events["StrategyHarvested"])
+    assert vault.strategies(strategy).dict()["totalDebt"] > 0
+    assert vault.strategies(strategyNotKept).dict()["totalDebt"] == 0
+
+    with brownie.reverts("!authorized"):
+        batchHarvester.harvest([strategy], {"from": accounts[1]})
@@ -0,0 +1,31 @@
+import brownie
+
+
+def test_withdrawal_buffer(vault, strategy, token, tokenWhale, gov, idleToken, chain):
+    amount = 1000 * (10 ** token.decimals())
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    strategy.setBufferRatio(1_000, {"from": gov})
+    vault.deposit(amount, {"from": tokenWhale})
+
+    # 10% of the debt stays in want
+    strategy.harvest({"from": gov})
+    buffer = vault.strategies(strategy).dict()["totalDebt"] // 10
+    assert strategy.balanceOfWant() == buffer
+
+    # A small withdrawal doesn't redeem from Idle
+    idleTokenBalance = idleToken.balanceOf(strategy)
+    vault.withdraw(vault.balanceOf(tokenWhale) // 20, {"from": tokenWhale})
+    assert idleToken.balanceOf(strategy) == idleTokenBalance
+    assert strategy.balanceOfWant() < buffer
+
+    # The next harvest refills it
+    chain.sleep(3600)
+    strategy.harvest({"from": gov})
+    assert idleToken.balanceOf(strategy) < idleTokenBalance
+    # Up to 1 wei of rounding on redeem
+    assert strategy.balanceOfWant() + 1 >= vault.strategies(strategy).dict()["totalDebt"] // 10
+
+    with brownie.reverts("bufferRatio too high"):
+        strategy.setBufferRatio(10_001, {"from": gov})
@@ -0,0 +1,319 @@
+import pytest
+import brownie
+
+from conftest import minGovTokenRatesOf
+
+# Converter routing on the mock Uniswap router and Balancer pool
+pytestmark = pytest.mark.mocks
+
+
+def mintAndApprove(assets, amounts, user, spender):
+    for asset, amount in zip(assets, amounts):
+        asset.mint(user, amount, {"from": user})
+        asset.approve(spender, amount, {"from": user})
+
+
+def test_convert_many(converter, accounts, comp, idle, weth, token):
+    user = accounts[0]
+    amounts = [10 * 10 ** 18, 100 * 10 ** 18]
+    mintAndApprove([comp, idle], amounts, user, converter)
+
+    balancePre = token.balanceOf(user)
+    tx = converter.convertMany([comp, idle], amounts, 1, token, user, {"from": user})
+
+    # IDLE => WETH on Balancer, COMP => WETH and a single WETH => want on Uniswap
+    assert tx.events.count("LOG_SWAP") == 1
+    assert tx.events.count("Swap") == 2
+    assert tx.return_value == token.balanceOf(user) - balancePre
+
+    for asset in [comp, idle, weth, token]:
+        assert asset.balanceOf(converter) == 0
+
+
+def test_convert_many_min_out(converter, accounts, comp, idle, token):
+    user = accounts[0]
+    amounts = [10 ** 18, 10 ** 18]
+    mintAndApprove([comp, idle], amounts, user, converter)
+
+    with brownie.reverts("Converter: insufficient output amount"):
+        converter.convertMany([comp, idle], amounts, 2 ** 256 - 1, token, user, {"from": user})
+
+
+def test_strategy_batch_conversion(vault, strategy, converter, token, tokenWhale, gov, strategist, chain):
+    assert strategy.batchConverter()
+
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    chain.sleep(3600)
+
+    tx = strategy.harvest({"from": gov})
+    assert tx.events.count("LOG_SWAP") == 1
+    assert tx.events.count("Swap") == 2
+    assert tx.events["Harvested"]["profit"] > 0
+
+    # Anything not implementing ERC165 falls back to one convert per gov token
+    strategy.setConverter(strategist, {"from": gov})
+    assert not strategy.batchConverter()
+    strategy.setConverter(converter, {"from": gov})
+    assert strategy.batchConverter()
+
+
+def test_strategy_batch_conversion_fallback(
+    vault, strategy, token, tokenWhale, gov, comp, idle, accounts, MockERC20, chain
+):
+    # A gov token without any route reverts convertMany
+    noRoute = accounts[0].deploy(MockERC20, "No route", "NOROUTE", 18)
+    strategy.setGovTokens([comp, idle, noRoute], {"from": gov})
+    strategy.setMinGovTokenRates([noRoute], [1], {"from": gov})
+
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    noRoute.mint(strategy, 10 ** 18, {"from": accounts[0]})
+    chain.mine(100)
+    chain.sleep(3600)
+
+    # The other gov tokens are converted one by one
+    tx = strategy.harvest({"from": gov})
+    assert tx.events["GovTokenConversionFailed"]["govToken"] == noRoute
+    assert tx.events["GovTokenConversionFailed"]["amount"] == 10 ** 18
+    assert comp.balanceOf(strategy) == 0
+    assert idle.balanceOf(strategy) == 0
+    assert noRoute.balanceOf(strategy) == 10 ** 18
+
+
+def test_strategy_min_gov_token_rates(
+    vault, strategy, converter, token, tokenWhale, gov, comp, idle, accounts, chain
+):
+    with brownie.reverts("!authorized"):
+        strategy.setMinGovTokenRates([comp], [1], {"from": accounts[5]})
+    with brownie.reverts("Lengths mismatch"):
+        strategy.setMinGovTokenRates([comp, idle], [1], {"from": gov})
+
+    # No COMP price can reach this floor
+    strategy.setMinGovTokenRates([comp], [10 ** 40], {"from": gov})
+    assert strategy.minGovTokenRates(comp) == 10 ** 40
+
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    chain.sleep(3600)
+
+    tx = strategy.harvest({"from": gov})
+    assert tx.events["GovTokenConversionFailed"]["govToken"] == comp
+    assert comp.balanceOf(strategy) > 0
+    assert idle.balanceOf(strategy) == 0
+
+    # With a reachable floor the kept COMP goes through on the next harvest
+    strategy.setMinGovTokenRates([comp], minGovTokenRatesOf(converter, [comp], token), {"from": gov})
+    chain.sleep(3600)
+    strategy.harvest({"from": gov})
+    assert comp.balanceOf(strategy) == 0
+
+
+def test_strategy_gov_token_without_rate(vault, strategy, token, tokenWhale, gov, comp, idle, chain):
+    # A rate of 0 is the same as no rate: COMP is kept and not valued
+    strategy.setMinGovTokenRates([comp], [0], {"from": gov})
+
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    chain.sleep(3600)
+
+    tx = strategy.harvest({"from": gov})
+    assert "GovTokenConversionFailed" not in tx.events
+    assert comp.balanceOf(strategy) > 0
+    assert idle.balanceOf(strategy) == 0
+
+    valueWithoutComp = strategy.estimatedGovTokensValue()
+    strategy.setMinGovTokenRates([comp], [1], {"from": gov})
+    assert strategy.estimatedGovTokensValue() > valueWithoutComp
+
+
+def test_max_slippage(converter, accounts, strategist):
+    assert converter.getMaxSlippage() == 300
+
+    converter.setMaxSlippage(50, {"from": strategist})
+    assert converter.getMaxSlippage() == 50
+
+    with brownie.reverts("Converter: slippage too high"):
+        converter.setMaxSlippage(10_001, {"from": strategist})
+
+    with brownie.reverts("Ownable: caller is not the owner"):
+        converter.setMaxSlippage(50, {"from": accounts[0]})
+
+
+def test_convert_slippage_bound(converter, accounts, strategist, uniswap, bpool, comp, idle, weth, token):
+    user = accounts[0]
+    converter.setMaxSlippage(100, {"from": strategist})
+
+    # 10% of the COMP/WETH pool moves the price by far more than 1%
+    amount = uniswap.reserves(comp, weth) // 10
+    mintAndApprove([comp], [amount], user, converter)
+    with brownie.reverts("UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT"):
+        converter.convert(amount, 1, comp, token, user, {"from": user})
+
+    amount = bpool.getBalance(idle) // 10
+    mintAndApprove([idle], [amount], user, converter)
+    with brownie.reverts("ERR_LIMIT_OUT"):
+        converter.convert(amount, 1, idle, weth, user, {"from": user})
+
+    # Small amounts stay within the bound
+    converter.convert(10 ** 18, 1, comp, token, user, {"from": user})
+    converter.convert(10 ** 18, 1, idle, weth, user, {"from": user})
+
+
+def test_harvest_skips_gov_tokens_over_slippage(
+    vault, strategy, converter, uniswap, comp, weth, token, tokenWhale, gov, strategist, chain
+):
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+
+    converter.setMaxSlippage(100, {"from": strategist})
+    amount = uniswap.reserves(comp, weth) // 10
+    comp.mint(strategy, amount, {"from": gov})
+    chain.sleep(3600)
+
+    # Harvest goes through, COMP is kept for a later harvest
+    strategy.harvest({"from": gov})
+    assert comp.balanceOf(strategy) >= amount
+
+
+def test_routers(converter, accounts, strategist, MockUniswapRouter):
+    sushiswap = accounts[0].deploy(MockUniswapRouter)
+
+    with brownie.reverts("Ownable: caller is not the owner"):
+        converter.addRouter(sushiswap, {"from": accounts[0]})
+
+    converter.addRouter(sushiswap, {"from": strategist})
+    assert converter.getRouters() == [sushiswap]
+    with brownie.reverts("Converter: router already added"):
+        converter.addRouter(sushiswap, {"from": strategist})
+
+    converter.removeRouter(sushiswap, {"from": strategist})
+    assert converter.getRouters() == []
+    with brownie.reverts("Converter: router not found"):
+        converter.removeRouter(sushiswap, {"from": strategist})
+
+
+def test_best_route(converter, accounts, strategist, uniswap, MockUniswapRouter, comp, idle, weth, token):
+    user = accounts[0]
+    amount = 100 * 10 ** 18
+
+    # Default: through WETH on the default router, IDLE first leg on Balancer
+    balancer, router, path, amountOut = converter.getBestRoute(amount, comp, token)
+    assert (balancer, router, path) == (False, uniswap, [comp, weth, token])
+    balancer, router, path, _ = converter.getBestRoute(amount, idle, token)
+    assert (balancer, router, path) == (True, uniswap, [weth, token])
+
+    # A second router with a deep direct COMP/want pair wins the COMP route
+    sushiswap = accounts[0].deploy(MockUniswapRouter)
+    sushiswap.setReserves(comp, token, uniswap.reserves(comp, weth) * 10, uniswap.reserves(token, weth) * 10)
+    converter.addRouter(sushiswap, {"from": strategist})
+
+    balancer, router, path, bestAmountOut = converter.getBestRoute(amount, comp, token)
+    assert (balancer, router, path) == (False, sushiswap, [comp, token])
+    assert bestAmountOut > amountOut
+    assert converter.getAmountOut(amount, comp, token) == bestAmountOut
+
+    mintAndApprove([comp], [amount], user, converter)
+    balancePre = token.balanceOf(user)
+    tx = converter.convert(amount, 1, comp, token, user, {"from": user})
+    assert tx.events["Swap"]["sender"] == converter
+    assert tx.events["Swap"].address == sushiswap
+    assert token.balanceOf(user) - balancePre == bestAmountOut
+
+    # Routes with missing pairs are skipped
+    with brownie.reverts("Converter: no route"):
+        converter.getAmountOut(amount, comp, accounts[1])
+
+
+def test_max_splits(converter, accounts, strategist, comp):
+    assert converter.getMaxSplits() == 4
+    assert converter.getSplitThreshold(comp) == 0
+
+    converter.setMaxSplits(converter.MAX_SPLITS(), {"from": strategist})
+    with brownie.reverts("Converter: invalid max splits"):
+        converter.setMaxSplits(0, {"from": strategist})
+    with brownie.reverts("Converter: invalid max splits"):
+        converter.setMaxSplits(converter.MAX_SPLITS() + 1, {"from": strategist})
+
+    with brownie.reverts("Ownable: caller is not the owner"):
+        converter.setSplitThreshold(comp, 1, {"from": accounts[0]})
+
+
+def test_split_conversion(converter, accounts, strategist, uniswap, MockUniswapRouter, comp, weth, token):
+    user = accounts[0]
+
+    # A second router as deep as the default one
+    sushiswap = accounts[0].deploy(MockUniswapRouter)
+    for asset in [comp, token]:
+        sushiswap.setReserves(asset, weth, uniswap.reserves(asset, weth), uniswap.reserves(weth, asset))
+    converter.addRouter(sushiswap, {"from": strategist})
+
+    amount = uniswap.reserves(comp, weth) // 100
+    singleAmountOut = converter.getAmountOut(amount, comp, token)
+
+    converter.setSplitThreshold(comp, amount, {"from": strategist})
+    splitAmountOut = converter.getAmountOut(amount, comp, token)
+    assert splitAmountOut > singleAmountOut
+
+    routers, balancer, amounts = converter.getSplit(amount, comp, token)
+    assert routers[:2] == [uniswap, sushiswap]
+    assert amounts[0] == amounts[1] == amount // 2
+    assert sum(amounts) == amount
+    assert not any(balancer)
+
+    mintAndApprove([comp], [amount], user, converter)
+    balancePre = token.balanceOf(user)
+    tx = converter.convert(amount, splitAmountOut, comp, token, user, {"from": user})
+    assert {event.address for event in tx.events["Swap"]} == {uniswap.address, sushiswap.address}
+    assert token.balanceOf(user) - balancePre == splitAmountOut
+
+    # Below the threshold a single route is used
+    mintAndApprove([comp], [amount // 2], user, converter)
+    tx = converter.convert(amount // 2, 1, comp, token, user, {"from": user})
+    assert {event.address for event in tx.events["Swap"]} == {uniswap.address}
+
+
+def test_split_conversion_shallow_pool(converter, strategist, uniswap, bpool, idle, weth):
+    # Balancer is twice as cheap as Uniswap, but past its max in ratio for the whole amount
+    amount = uniswap.reserves(idle, weth) // 1000
+    bpool.setBalance(idle, amount)
+    bpool.setBalance(weth, 2 * amount * uniswap.reserves(weth, idle) // uniswap.reserves(idle, weth))
+    balancer, router, _, singleAmountOut = converter.getBestRoute(amount, idle, weth)
+    assert (balancer, router) == (False, uniswap)
+
+    # Its chunks are still quoted
+    converter.setSplitThreshold(idle, amount, {"from": strategist})
+    routers, balancer, amounts = converter.getSplit(amount, idle, weth)
+    assert balancer[-1] and amounts[-1] > 0
+    assert amounts[0] > 0
+    assert sum(amounts) == amount
+    assert converter.getAmountOut(amount, idle, weth) > singleAmountOut
+
+
+def test_split_conversion_shared_leg(converter, strategist, bpool, idle, token):
+    # The Balancer route ends on the uniswap WETH/want pair, as the uniswap route through WETH does
+    amount = bpool.getBalance(idle) // 100
+    converter.setSplitThreshold(idle, amount, {"from": strategist})
+
+    routers, balancer, amounts = converter.getSplit(amount, idle, token)
+    assert sum(amounts) == amount
+    assert len([routeAmount for routeAmount in amounts if routeAmount > 0]) == 1
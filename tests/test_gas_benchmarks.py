@@ -0,0 +1,274 @@
+import pytest
+
+from conftest import MOCK_POOL_DEPTH, MOCK_WETH_PRICE, minGovTokenRatesOf, mockAmount
+
+# Gas of the StrategyIdle hot paths, checked against tests/gas-baseline.json:
+#   harvest        => prepareReturn + adjustPosition
+#   withdraw       => liquidatePosition + freeAmount (or the want buffer)
+#   migrate        => prepareMigration
+#   emergency exit => liquidateAllPositions
+#   batch harvest  => BatchHarvester vs one transaction per strategy
+#   read           => the clone args from storage vs from the clone code (immutable args)
+# Run with `--mocks` (deterministic state), `--update-gas-baseline` to record.
+pytestmark = pytest.mark.mocks
+
+
+def setUp(vault, strategy, token, tokenWhale, gov, amount=1000):
+    amount = amount * (10 ** token.decimals())
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(amount, {"from": tokenWhale})
+    return amount
+
+
+def stopGovTokens(mockIdleToken, comp, idle):
+    mockIdleToken.setGovTokenRate(comp, 0)
+    mockIdleToken.setGovTokenRate(idle, 0)
+
+
+def increasePrice(mockIdleToken, bps=100):
+    mockIdleToken.setTokenPrice(mockIdleToken.tokenPrice() * (10_000 + bps) // 10_000)
+
+
+def cloneOf(strategy, strategyFactory, vault, immutableArgs):
+    # Suffix of the benchmark names for clones with immutable args
+    if immutableArgs:
+        return strategyFactory(vault, immutableArgs=True), "_immutable_args"
+    return strategy, ""
+
+
+def assertImmutableArgsSaving(gasBenchmark, group, name, tx):
+    # The clone reading its args from storage runs first (immutableArgs=False) on the same worker
+    regular = gasBenchmark.results.get(group, {}).get(name)
+    if regular is not None:
+        assert tx.gas_used < regular, f"{group} {name}: {tx.gas_used} gas with immutable args, {regular} without"
+
+
+def test_harvest_deposit(vault, strategy, token, tokenWhale, gov, gasBenchmark):
+    setUp(vault, strategy, token, tokenWhale, gov)
+
+    tx = strategy.harvest({"from": gov})
+    gasBenchmark.record(token.symbol(), "harvest/deposit", tx)
+
+
+def test_harvest_no_profit(vault, strategy, token, tokenWhale, gov, mockIdleToken, comp, idle, chain, gasBenchmark):
+    setUp(vault, strategy, token, tokenWhale, gov)
+    stopGovTokens(mockIdleToken, comp, idle)
+    strategy.harvest({"from": gov})
+    chain.sleep(3600)
+
+    tx = strategy.harvest({"from": gov})
+    gasBenchmark.record(token.symbol(), "harvest/no_profit", tx)
+
+
+@pytest.mark.parametrize("immutableArgs", [False, True])
+def test_harvest_profit(
+    vault, strategy, strategyFactory, token, tokenWhale, gov, mockIdleToken, comp, idle, chain, immutableArgs, gasBenchmark
+):
+    strategy, suffix = cloneOf(strategy, strategyFactory, vault, immutableArgs)
+    setUp(vault, strategy, token, tokenWhale, gov)
+    stopGovTokens(mockIdleToken, comp, idle)
+    strategy.harvest({"from": gov})
+    chain.sleep(3600)
+    increasePrice(mockIdleToken)
+
+    tx = strategy.harvest({"from": gov})
+    assert tx.events["Harvested"]["profit"] > 0
+    gasBenchmark.record(token.symbol(), f"harvest/profit{suffix}", tx)
+    if immutableArgs:
+        assertImmutableArgsSaving(gasBenchmark, token.symbol(), "harvest/profit", tx)
+
+
+def test_harvest_debt_outstanding(vault, strategy, token, tokenWhale, gov, mockIdleToken, comp, idle, chain, gasBenchmark):
+    setUp(vault, strategy, token, tokenWhale, gov)
+    stopGovTokens(mockIdleToken, comp, idle)
+    strategy.harvest({"from": gov})
+    chain.sleep(3600)
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+
+    tx = strategy.harvest({"from": gov})
+    assert tx.events["Harvested"]["debtPayment"] > 0
+    gasBenchmark.record(token.symbol(), "harvest/debt_outstanding", tx)
+
+
+@pytest.mark.parametrize("govTokensLength", range(6))
+def test_harvest_gov_tokens(
+    vault, strategy, converter, token, tokenWhale, gov, accounts, mockIdleToken, uniswap, weth, MockERC20, chain,
+    govTokensLength, gasBenchmark
+):
+    assert govTokensLength <= strategy.MAX_GOV_TOKENS_LENGTH()
+
+    govTokens = []
+    for i in range(govTokensLength):
+        govToken = accounts[0].deploy(MockERC20, f"Gov {i}", f"GOV{i}", 18)
+        uniswap.setReserves(
+            govToken,
+            weth,
+            mockAmount(MOCK_POOL_DEPTH, 10),
+            mockAmount(MOCK_POOL_DEPTH, MOCK_WETH_PRICE),
+        )
+        mockIdleToken.setGovTokenRate(govToken, 10 ** 14)
+        govTokens.append(govToken)
+    mockIdleToken.setGovTokens(govTokens)
+    strategy.setGovTokens(govTokens, {"from": gov})
+    strategy.setMinGovTokenRates(govTokens, minGovTokenRatesOf(converter, govTokens, token), {"from": gov})
+
+    setUp(vault, strategy, token, tokenWhale, gov)
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    chain.sleep(3600)
+
+    tx = strategy.harvest({"from": gov})
+    gasBenchmark.record(token.symbol(), f"harvest/gov_tokens_{govTokensLength}", tx)
+
+
+@pytest.mark.parametrize("immutableArgs", [False, True])
+def test_withdraw_and_harvest(
+    vault, strategy, strategyFactory, token, tokenWhale, gov, mockIdleToken, comp, idle, chain, immutableArgs, gasBenchmark
+):
+    strategy, suffix = cloneOf(strategy, strategyFactory, vault, immutableArgs)
+    setUp(vault, strategy, token, tokenWhale, gov)
+    stopGovTokens(mockIdleToken, comp, idle)
+    strategy.harvest({"from": gov})
+    chain.sleep(3600)
+    increasePrice(mockIdleToken)
+
+    idleTokenBalance = mockIdleToken.balanceOf(strategy)
+    tx = vault.withdraw(vault.balanceOf(tokenWhale) // 10, {"from": tokenWhale})
+    assert mockIdleToken.balanceOf(strategy) < idleTokenBalance
+    gasBenchmark.record(token.symbol(), f"withdraw/free_amount{suffix}", tx)
+
+    tx = strategy.harvest({"from": gov})
+    gasBenchmark.record(token.symbol(), f"harvest/after_withdrawal{suffix}", tx)
+    # The withdrawal only reads idleYieldToken, whose slot the flags warm anyway, the harvest drips the reservoir
+    if immutableArgs:
+        assertImmutableArgsSaving(gasBenchmark, token.symbol(), "harvest/after_withdrawal", tx)
+
+
+def test_immutable_args_reads(vault, strategyFactory, token, gasBenchmark):
+    # Each getter alone: a cold SLOAD against a warm EXTCODECOPY on the clone
+    regular = strategyFactory(vault)
+    immutable = strategyFactory(vault, immutableArgs=True)
+    storageGas = codeGas = 0
+    for getter in ["getWeth", "idleReservoir", "idleYieldToken", "referral"]:
+        assert getattr(regular, getter)() == getattr(immutable, getter)()
+        storageGas += getattr(regular, getter).estimate_gas()
+        codeGas += getattr(immutable, getter).estimate_gas()
+
+    gasBenchmark.record(token.symbol(), "read/storage_args", storageGas)
+    gasBenchmark.record(token.symbol(), "read/immutable_args", codeGas)
+    assert codeGas < storageGas
+
+
+def test_migrate(vault, strategy, strategyFactory, token, tokenWhale, gov, chain, gasBenchmark):
+    setUp(vault, strategy, token, tokenWhale, gov)
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    strategyNext = strategyFactory(vault)
+
+    tx = vault.migrateStrategy(strategy, strategyNext, {"from": gov})
+    gasBenchmark.record(token.symbol(), "migrate", tx)
+
+
+def test_emergency_exit(vault, strategy, token, tokenWhale, gov, chain, gasBenchmark):
+    setUp(vault, strategy, token, tokenWhale, gov)
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    strategy.setEmergencyExit({"from": gov})
+
+    tx = strategy.harvest({"from": gov})
+    gasBenchmark.record(token.symbol(), "harvest/emergency_exit", tx)
+
+
+def test_batch_harvest(
+    vault, strategy, strategyFactory, batchHarvester, token, tokenWhale, gov, keeper, mockIdleToken, comp, idle, chain,
+    gasBenchmark
+):
+    strategies = [strategy] + [strategyFactory(vault) for _ in range(2)]
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    for s in strategies:
+        vault.addStrategy(s, 3_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(3000 * (10 ** token.decimals()), {"from": tokenWhale})
+    stopGovTokens(mockIdleToken, comp, idle)
+    for s in strategies:
+        s.harvest({"from": keeper})
+    chain.sleep(3600)
+
+    # The same no profit harvest, separately then in a batch
+    txs = [s.harvest({"from": keeper}) for s in strategies]
+    gasBenchmark.record(token.symbol(), "harvest/separate_x3", sum(tx.gas_used for tx in txs))
+    chain.sleep(3600)
+
+    for s in strategies:
+        s.setKeeper(batchHarvester, {"from": gov})
+    tx = batchHarvester.harvest(strategies, {"from": keeper})
+    assert [event["success"] for event in tx.events["StrategyHarvested"]] == [True] * 3
+    gasBenchmark.record(token.symbol(), "harvest/batch_x3", tx)
+
+    # Two of the three 21000 intrinsic costs are saved, less the BatchHarvester loop and events
+    separateGas = sum(t.gas_used for t in txs)
+    assert separateGas - tx.gas_used >= 21000, f"batch {tx.gas_used} gas, separate {separateGas}"
+
+
+def test_withdraw_from_buffer(vault, strategy, token, tokenWhale, gov, mockIdleToken, chain, gasBenchmark):
+    strategy.setBufferRatio(1_000, {"from": gov})
+    setUp(vault, strategy, token, tokenWhale, gov)
+    strategy.harvest({"from": gov})
+    chain.sleep(3600)
+
+    idleTokenBalance = mockIdleToken.balanceOf(strategy)
+    tx = vault.withdraw(vault.balanceOf(tokenWhale) // 20, {"from": tokenWhale})
+    assert mockIdleToken.balanceOf(strategy) == idleTokenBalance
+    gasBenchmark.record(token.symbol(), "withdraw/buffer", tx)
+
+    # Past the buffer the same strategy redeems IdleTokens
+    redeemTx = vault.withdraw(vault.balanceOf(tokenWhale) // 5, {"from": tokenWhale})
+    assert mockIdleToken.balanceOf(strategy) < idleTokenBalance
+    assert tx.gas_used < redeemTx.gas_used, f"buffer {tx.gas_used} gas, redeem {redeemTx.gas_used}"
+
+
+def test_harvest_min_deploy(vault, strategy, token, tokenWhale, gov, keeper, mockIdleToken, chain, gasBenchmark):
+    unit = 10 ** token.decimals()
+    strategy.setMinDeployAmount(100 * unit, {"from": gov})
+    setUp(vault, strategy, token, tokenWhale, gov, amount=10)
+
+    # Below the minimum, nothing is minted
+    tx = strategy.harvest({"from": gov})
+    assert mockIdleToken.balanceOf(strategy) == 0
+    gasBenchmark.record(token.symbol(), "harvest/accumulate", tx)
+    accumulateGas = tx.gas_used
+
+    vault.deposit(100 * unit, {"from": tokenWhale})
+    chain.sleep(3600)
+    deployed = strategy.balanceOfWant() + vault.creditAvailable(strategy)
+    tx = strategy.harvest({"from": gov})
+    assert strategy.balanceOfWant() == 0
+    gasBenchmark.record(token.symbol(), "harvest/deploy", tx)
+    # Skipping the mint is the saving of a harvest below the minimum
+    assert accumulateGas < tx.gas_used, f"accumulate {accumulateGas} gas, deploy {tx.gas_used}"
+    # Gas per 1000 want deployed
+    gasBenchmark.record(token.symbol(), "harvest/deploy_gas_per_1k_want", tx.gas_used * 1000 * unit // deployed)
+
+    vault.deposit(10 * unit, {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    assert strategy.balanceOfWant() > 0
+    strategy.forceDeploy({"from": keeper})
+    assert strategy.balanceOfWant() == 0
+
+
+def test_tend_vs_harvest_gov_tokens(vault, strategy, token, tokenWhale, gov, keeper, chain, gasBenchmark):
+    setUp(vault, strategy, token, tokenWhale, gov)
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+
+    # The same gov tokens compounded by tend, then by a harvest
+    tx = strategy.tend({"from": keeper})
+    gasBenchmark.record(token.symbol(), "tend/compound", tx)
+    tendGas = tx.gas_used
+    chain.mine(100)
+
+    tx = strategy.harvest({"from": keeper})
+    gasBenchmark.record(token.symbol(), "harvest/compound", tx)
+    assert tendGas < tx.gas_used
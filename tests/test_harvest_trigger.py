@@ -0,0 +1,104 @@
+import pytest
+
+pytestmark = pytest.mark.mocks
+
+
+def test_harvest_trigger_gov_tokens(vault, strategy, token, tokenWhale, gov, chain):
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+
+    # 0.001 ETH, harvest once gov tokens are worth profitFactor (100) times more
+    callCost = 10 ** 15
+    assert not strategy.harvestTrigger(callCost)
+
+    # COMP and IDLE accrue in the IdleToken, nothing is held by the strategy yet
+    chain.mine(1000)
+    value = strategy.estimatedGovTokensValue()
+    assert value > strategy.profitFactor() * strategy.ethToWant(callCost)
+    assert strategy.harvestTrigger(callCost)
+
+    strategy.setProfitFactor(strategy.profitFactor() * 10, {"from": gov})
+    assert not strategy.harvestTrigger(callCost)
+
+
+def test_tend_compounds_gov_tokens(vault, strategy, token, tokenWhale, gov, keeper, mockIdleToken, comp, idle, chain):
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+
+    callCost = 10 ** 15
+    assert not strategy.tendTrigger(callCost)
+    strategy.setTendProfitFactor(100, {"from": gov})
+    chain.mine(1000)
+
+    # Gov tokens are left to tend
+    assert strategy.tendTrigger(callCost)
+    assert not strategy.harvestTrigger(callCost)
+
+    idleTokenBalance = mockIdleToken.balanceOf(strategy)
+    lastReport = vault.strategies(strategy).dict()["lastReport"]
+    strategy.tend({"from": keeper})
+
+    assert mockIdleToken.balanceOf(strategy) > idleTokenBalance
+    assert comp.balanceOf(strategy) == idle.balanceOf(strategy) == 0
+    assert strategy.balanceOfWant() == 0
+    assert vault.strategies(strategy).dict()["lastReport"] == lastReport
+    assert not strategy.tendTrigger(callCost)
+
+
+def test_eth_to_want_cached_rate(vault, strategy, converter, uniswap, weth, token, tokenWhale, gov, chain):
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+
+    rate = strategy.wethToWantRate()
+    assert rate == converter.getAmountOut(10 ** 18, weth, token)
+    assert strategy.wethToWantRateUpdatedAt() == chain[-1].timestamp
+
+    # Double the WETH price, the cached rate is used until it's stale
+    uniswap.setReserves(weth, token, uniswap.reserves(weth, token) // 2, uniswap.reserves(token, weth))
+    assert strategy.ethToWant(10 ** 18) == rate
+
+    chain.sleep(strategy.rateStaleness() + 1)
+    chain.mine()
+    assert strategy.ethToWant(10 ** 18) == converter.getAmountOut(10 ** 18, weth, token)
+
+    # tend refreshes the rate as well
+    strategy.tend({"from": gov})
+    assert strategy.wethToWantRate() == converter.getAmountOut(10 ** 18, weth, token)
+    assert strategy.ethToWant(10 ** 18) == strategy.wethToWantRate()
+
+    strategy.setRateStaleness(0, {"from": gov})
+    assert strategy.ethToWant(10 ** 17) == converter.getAmountOut(10 ** 17, weth, token)
+
+
+def test_eth_to_want_rate_overflow(
+    vault, strategy, converter, uniswap, weth, token, tokenWhale, gov, mockIdleToken, comp, idle, chain
+):
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** token.decimals()), {"from": tokenWhale})
+    mockIdleToken.setGovTokenRate(comp, 0)
+    mockIdleToken.setGovTokenRate(idle, 0)
+    strategy.harvest({"from": gov})
+    rate = strategy.wethToWantRate()
+    updatedAt = strategy.wethToWantRateUpdatedAt()
+
+    # 1 WETH quotes more want than fits in a uint128
+    uniswap.setReserves(weth, token, 10 ** 10, 10 ** 50)
+    assert converter.getAmountOut(10 ** 18, weth, token) > 2 ** 128 - 1
+    chain.sleep(3600)
+
+    # Pricing doesn't block harvest nor tend, the cached rate is kept
+    strategy.harvest({"from": gov})
+    strategy.tend({"from": gov})
+    assert strategy.wethToWantRate() == rate
+    assert strategy.wethToWantRateUpdatedAt() == updatedAt
@@ -0,0 +1,55 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from scripts.indexer import Config, index
+
+# The indexer talks JSON-RPC to the local chain directly
+pytestmark = pytest.mark.mocks
+
+
+def test_indexer(
+    web3, chain, vault, strategy, token, tokenWhale, gov, proxyFactoryInitializable, converter, bpool, uniswap, tmp_path
+):
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * (10 ** token.decimals()), {"from": tokenWhale})
+    harvests = [strategy.harvest({"from": gov})]
+    chain.mine(100)
+    # Gov tokens accrued, converted through Balancer (IDLE) and Uniswap (COMP)
+    harvests.append(strategy.harvest({"from": gov}))
+
+    # Small ranges so the run takes several rounds
+    config = Config(
+        strategies=[strategy.address],
+        factories=[proxyFactoryInitializable.address],
+        bpools=[bpool.address],
+        pairs=[uniswap.address],
+        converters=[converter.address],
+        confirmations=0,
+        initialRange=2,
+        maxRange=8,
+    )
+    db = sqlite3.connect(tmp_path / "indexer.db")
+    assert asyncio.run(index(web3.provider.endpoint_uri, config, db)) > 0
+
+    rows = db.execute("SELECT tx, profit, gasUsed FROM harvests WHERE strategy = ? ORDER BY block", (strategy.address,))
+    assert [(tx, gasUsed) for tx, _, gasUsed in rows] == [(tx.txid, tx.gas_used) for tx in harvests]
+    profit = harvests[1].events["Harvested"]["profit"]
+    assert db.execute("SELECT profit FROM harvests WHERE tx = ?", (harvests[1].txid,)).fetchone() == (str(profit),)
+
+    assert (strategy.address,) in db.execute("SELECT proxy FROM proxies").fetchall()
+    assert db.execute("SELECT COUNT(*) FROM balancerSwaps WHERE caller = ?", (converter.address,)).fetchone()[0] > 0
+    assert db.execute("SELECT COUNT(*) FROM uniswapSwaps WHERE tx = ?", (harvests[1].txid,)).fetchone()[0] > 0
+
+    checkpoints = dict(db.execute("SELECT address, block FROM checkpoints"))
+    assert checkpoints[strategy.address] == web3.eth.block_number
+
+    # A rerun only fetches the new blocks
+    assert asyncio.run(index(web3.provider.endpoint_uri, config, db)) == 0
+    tx = strategy.harvest({"from": gov})
+    assert asyncio.run(index(web3.provider.endpoint_uri, config, db)) >= 1
+    assert db.execute("SELECT COUNT(*) FROM harvests").fetchone()[0] == 3
+    assert db.execute("SELECT block FROM harvests ORDER BY block DESC").fetchone()[0] == tx.block_number
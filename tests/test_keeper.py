@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from scripts.keeper import Config, Keeper, KeeperAccount
+from scripts.rpc import RpcClient
+
+# The keeper talks JSON-RPC to the local chain directly
+pytestmark = pytest.mark.mocks
+
+
+def runKeeper(web3, config, keeperAccounts, *steps, clock=None):
+    """Set up a keeper and run one cycle per step, a step is called before its cycle"""
+
+    async def run():
+        async with RpcClient(web3.provider.endpoint_uri) as rpc:
+            keeper = Keeper(rpc, config, keeperAccounts, **({"clock": clock} if clock else {}))
+            await keeper.setup()
+            for step in steps:
+                step(keeper)
+                await keeper.cycle()
+            return keeper
+
+    return asyncio.run(run())
+
+
+def noop(keeper):
+    pass
+
+
+def test_keeper_harvest_and_tend(web3, accounts, MockKeeperStrategy):
+    strategies = [accounts[0].deploy(MockKeeperStrategy) for _ in range(4)]
+    for strategy, triggers in zip(strategies, [(True, False), (False, True), (False, False), (True, True)]):
+        strategy.setTriggers(*triggers)
+
+    # Two accounts for three transactions, the last one waits for a free account
+    keeperAccounts = [KeeperAccount(accounts[6].address), KeeperAccount(accounts[7].address)]
+    config = Config(strategies=[strategy.address for strategy in strategies])
+    keeper = runKeeper(web3, config, keeperAccounts, noop, noop, noop)
+
+    assert [(strategy.harvests(), strategy.tends()) for strategy in strategies] == [(1, 0), (0, 1), (0, 0), (1, 0)]
+    assert keeper.pending == {}
+    assert {account.nonce for account in keeperAccounts} == {accounts[6].nonce, accounts[7].nonce}
+
+
+def test_keeper_skips_broken_strategy(web3, accounts, MockKeeperStrategy):
+    strategy = accounts[0].deploy(MockKeeperStrategy)
+    strategy.setTriggers(True, False)
+
+    # An account without code answers the triggers with "0x"
+    config = Config(strategies=[accounts[9].address, strategy.address])
+    keeper = runKeeper(web3, config, [KeeperAccount(accounts[6].address)], noop, noop)
+
+    assert strategy.harvests() == 1
+    assert keeper.pending == {}
+
+
+def test_keeper_replaces_stuck_transaction(web3, accounts, MockKeeperStrategy):
+    strategy = accounts[0].deploy(MockKeeperStrategy)
+    strategy.setTriggers(True, False)
+
+    now = [0]
+    config = Config(strategies=[strategy.address], replaceAfter=60)
+    sent = {}
+
+    def stopMining(keeper):
+        web3.provider.make_request("miner_stop", [])
+
+    def expire(keeper):
+        [tx] = keeper.pending.values()
+        sent["gasPrice"] = tx.gasPrice
+        now[0] += config.replaceAfter
+
+    def startMining(keeper):
+        [tx] = keeper.pending.values()
+        assert len(tx.hashes) == 2
+        assert tx.gasPrice > sent["gasPrice"]
+        web3.provider.make_request("miner_start", [])
+
+    keeper = runKeeper(
+        web3, config, [KeeperAccount(accounts[6].address)], stopMining, expire, startMining, noop, clock=lambda: now[0]
+    )
+
+    # Only one of the transactions sharing the nonce is mined
+    assert strategy.harvests() == 1
+    assert keeper.pending == {}
@@ -0,0 +1,38 @@
+import pytest
+
+from scripts.lens import snapshots
+
+pytestmark = pytest.mark.mocks
+
+
+def test_snapshots(vault, strategy, lens, idleController, mockIdleToken, token, tokenWhale, gov, accounts, MockERC20):
+    amount = 100 * (10 ** token.decimals())
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(amount, {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    idleController.setIdleAccrued(strategy, 10 ** 18)
+
+    # Anything that isn't a strategy is flagged, not reverted
+    [snapshot, unreadable] = snapshots(lens, [strategy, accounts[1]])
+
+    assert snapshot.ok
+    assert snapshot.strategy == strategy
+    assert snapshot.vault == vault
+    assert snapshot.want == token
+    assert snapshot.idleYieldToken == mockIdleToken
+    assert snapshot.estimatedTotalAssets == strategy.estimatedTotalAssets()
+    assert snapshot.tokenPrice == strategy.getTokenPrice()
+    assert snapshot.lastVirtualPrice == strategy.lastVirtualPrice()
+    assert snapshot.balanceOfWant == strategy.balanceOfWant()
+    assert snapshot.idleTokenBalance == mockIdleToken.balanceOf(strategy)
+    assert snapshot.idleAccrued == 10 ** 18
+    assert snapshot.govTokens == list(strategy.getGovTokens())
+    assert snapshot.govTokenBalanceOf == {
+        govToken: MockERC20.at(govToken).balanceOf(strategy) for govToken in snapshot.govTokens
+    }
+    assert snapshot.params.totalDebt == vault.strategies(strategy).dict()["totalDebt"] == amount
+
+    assert not unreadable.ok
+    assert unreadable.strategy == accounts[1]
@@ -0,0 +1,160 @@
+import time
+from collections import defaultdict
+
+import pytest
+from brownie import chain
+from brownie.test import strategy
+
+# Scale with --load-accounts, --load-runs and --load-steps
+pytestmark = pytest.mark.mocks
+
+
+class LoadReport:
+    """Operations, gas and accounting drift over every run of the state machine"""
+
+    def __init__(self):
+        self.gas = defaultdict(list)
+        self.start = time.perf_counter()
+        # estimatedTotalAssets - totalDebt, in want
+        self.minDrift = None
+        self.maxDrift = None
+
+    def record(self, operation, tx):
+        self.gas[operation].append(tx.gas_used)
+
+    def drift(self, drift):
+        self.minDrift = drift if self.minDrift is None else min(self.minDrift, drift)
+        self.maxDrift = drift if self.maxDrift is None else max(self.maxDrift, drift)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        operations = sum(len(gas) for gas in self.gas.values())
+        lines = [
+            f"{operations} transactions in {elapsed:.1f}s ({operations / elapsed:.1f} tx/s)",
+            f"estimatedTotalAssets - totalDebt: min {self.minDrift}, max {self.maxDrift}",
+            f"{'operation':<12} {'count':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}",
+        ]
+        for operation, gas in sorted(self.gas.items()):
+            gas = sorted(gas)
+            p50, p90, p99 = (gas[min(len(gas) - 1, len(gas) * p // 100)] for p in (50, 90, 99))
+            lines.append(f"{operation:<12} {len(gas):>6} {p50:>8} {p90:>8} {p99:>8} {gas[-1]:>8}")
+        return "\n".join(lines)
+
+
+class StateMachine:
+    """
+    Many depositors interleaving deposits, partial withdrawals, harvests, IdleToken price moves,
+    gov token accrual and want buffer changes, against one vault and one strategy
+    """
+
+    st_user = strategy("uint256")
+    # Share of a balance deposited or withdrawn, in bps
+    st_bps = strategy("uint256", min_value=1, max_value=10_000)
+    # IdleToken price increase, in bps
+    st_price_bps = strategy("uint256", max_value=50)
+    st_blocks = strategy("uint256", min_value=1, max_value=100)
+    # Want kept in the strategy for withdrawals, in bps of its debt
+    st_buffer_bps = strategy("uint256", max_value=2_000)
+
+    def __init__(cls, accounts, vault, strategy, token, mockIdleToken, gov, users, report):
+        cls.vault = vault
+        cls.strategy = strategy
+        cls.token = token
+        cls.mockIdleToken = mockIdleToken
+        cls.gov = gov
+        cls.report = report
+
+        decimals = token.decimals()
+        cls.users = []
+        for _ in range(users):
+            user = accounts.add()
+            accounts[0].transfer(user, 5 * 10 ** 16)
+            token.mint(user, 10_000 * 10 ** decimals, {"from": accounts[0]})
+            token.approve(vault, 2 ** 256 - 1, {"from": user})
+            cls.users.append(user)
+
+        vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+        vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+
+    def setup(self):
+        # Accounting after the previous step, and the gain reported since
+        self.drift = None
+        self.totalLoss = 0
+        self.reported = 0
+
+    def rule_deposit(self, st_user, st_bps):
+        user = self.users[st_user % len(self.users)]
+        amount = self.token.balanceOf(user) * st_bps // 10_000
+        if amount > 0:
+            self.report.record("deposit", self.vault.deposit(amount, {"from": user}))
+
+    def rule_withdraw(self, st_user, st_bps):
+        user = self.users[st_user % len(self.users)]
+        shares = self.vault.balanceOf(user) * st_bps // 10_000
+        if shares == 0:
+            return
+
+        wantBuffer = self.token.balanceOf(self.strategy)
+        idleTokens = self.mockIdleToken.balanceOf(self.strategy)
+        balance = self.token.balanceOf(user)
+        self.report.record("withdraw", self.vault.withdraw(shares, {"from": user}))
+
+        # Served by the buffer, at most the whole withdrawal comes from the strategy
+        if wantBuffer >= self.token.balanceOf(user) - balance:
+            assert self.mockIdleToken.balanceOf(self.strategy) == idleTokens
+
+    def rule_harvest(self):
+        tx = self.strategy.harvest({"from": self.gov})
+        self.report.record("harvest", tx)
+        self.reported += tx.events["Harvested"]["profit"]
+
+        # Everything above the buffer and the debt outstanding is deployed
+        toKeep = self.vault.debtOutstanding(self.strategy) + (
+            self.vault.strategies(self.strategy).dict()["totalDebt"] * self.strategy.bufferRatio() // 10_000
+        )
+        assert self.strategy.balanceOfWant() <= toKeep
+
+    def rule_buffer(self, st_buffer_bps):
+        self.strategy.setBufferRatio(st_buffer_bps, {"from": self.gov})
+
+    def rule_price(self, st_price_bps):
+        # Only increases, a decreasing virtual price reverts by design
+        price = self.mockIdleToken.tokenPrice()
+        self.mockIdleToken.setTokenPrice(price * (10_000 + st_price_bps) // 10_000)
+
+    def rule_accrue(self, st_blocks):
+        chain.mine(st_blocks)
+
+    def invariant_accounting(self):
+        params = self.vault.strategies(self.strategy).dict()
+        drift = self.strategy.estimatedTotalAssets() - params["totalDebt"]
+        self.report.drift(drift)
+
+        # Only a reported gain leaves the strategy, otherwise a step loses at most the rounding
+        # of one redeem (freeAmount's + 1, tokenPriceWithFee)
+        if self.drift is not None:
+            assert drift >= self.drift - self.reported - 2
+            assert params["totalLoss"] - self.totalLoss <= 2
+        self.drift = drift
+        self.totalLoss = params["totalLoss"]
+        self.reported = 0
+
+
+def test_load(state_machine, pytestconfig, accounts, vault, strategy, token, mockIdleToken, gov):
+    report = LoadReport()
+    state_machine(
+        StateMachine,
+        accounts,
+        vault,
+        strategy,
+        token,
+        mockIdleToken,
+        gov,
+        pytestconfig.getoption("--load-accounts"),
+        report,
+        settings={
+            "max_examples": pytestconfig.getoption("--load-runs"),
+            "stateful_step_count": pytestconfig.getoption("--load-steps"),
+        },
+    )
+    print(f"\n{token.symbol()} load test\n{report.summary()}")
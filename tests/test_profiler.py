@@ -0,0 +1,35 @@
+import pytest
+
+from scripts.profiler import INTRINSIC, profile
+
+pytestmark = pytest.mark.mocks
+
+
+def test_profile_harvest(vault, strategyFactory, token, tokenWhale, gov, chain):
+    # Without a proxy the trace starts in StrategyIdle
+    strategy = strategyFactory(vault, proxy=False)
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    chain.mine(100)
+    tx = strategy.harvest({"from": gov})
+
+    result = profile(tx)
+
+    # Every gas unit is attributed once
+    assert sum(result.stacks.values()) == tx.gas_used
+    assert result.stacks[(INTRINSIC,)] > 0
+
+    frames = result.frames
+    assert frames["StrategyIdle.harvest"].inclusiveGas == tx.gas_used - result.stacks[(INTRINSIC,)]
+    # Internal and external frames below harvest
+    for frame in ("StrategyIdle.prepareReturn", "StrategyIdle.adjustPosition", "MockIdleReservoir.drip"):
+        assert 0 < frames[frame].inclusiveGas < frames["StrategyIdle.harvest"].inclusiveGas
+    assert any(name.startswith("Converter.") for name in frames)
+
+    for line in result.collapsed().splitlines():
+        path, gas = line.rsplit(" ", 1)
+        assert int(gas) > 0
+        assert path == INTRINSIC or path.startswith("StrategyIdle.harvest")
@@ -0,0 +1,79 @@
+import brownie
+from brownie import config
+
+from conftest import immutableArgsOf
+
+
+def initData(strategyLogic, vault, strategist, comp, idle, weth, idleReservoir, idleToken, referral, converter):
+    return strategyLogic.init.encode_input(
+        vault, strategist, [comp, idle], weth, idleReservoir, idleToken, referral, converter
+    )
+
+
+def test_deploy_minimal_batch(
+    proxyFactoryInitializable, strategyLogic, pm, gov, guardian, rewards, strategist, token, comp, idle, weth,
+    idleReservoir, idleToken, referral, converter, StrategyIdle
+):
+    Vault = pm(config["dependencies"][0]).Vault
+    vaults = []
+    for _ in range(2):
+        vault = guardian.deploy(Vault)
+        vault.initialize(token, gov, rewards, "", "")
+        vaults.append(vault)
+
+    data = [
+        initData(strategyLogic, vault, strategist, comp, idle, weth, idleReservoir, idleToken, referral, converter)
+        for vault in vaults
+    ]
+    tx = proxyFactoryInitializable.deployMinimalBatch(strategyLogic, data, {"from": strategist})
+
+    proxies = tx.return_value
+    assert [event["proxy"] for event in tx.events["ProxyCreated"]] == list(proxies)
+    for proxy, vault in zip(proxies, vaults):
+        assert StrategyIdle.at(proxy).vault() == vault
+
+
+def test_deploy_minimal_deterministic(
+    proxyFactoryInitializable, strategyLogic, vault, strategist, accounts, comp, idle, weth, idleReservoir,
+    idleToken, referral, converter, StrategyIdle
+):
+    salt = "0x" + "01" * 32
+    data = initData(strategyLogic, vault, strategist, comp, idle, weth, idleReservoir, idleToken, referral, converter)
+
+    predicted = proxyFactoryInitializable.predictMinimalDeterministic(strategyLogic, salt, strategist)
+    # The salt is bound to the deployer
+    assert predicted != proxyFactoryInitializable.predictMinimalDeterministic(strategyLogic, salt, accounts[0])
+
+    tx = proxyFactoryInitializable.deployMinimalDeterministic(strategyLogic, data, salt, {"from": strategist})
+    assert tx.events["ProxyCreated"]["proxy"] == predicted
+    assert StrategyIdle.at(predicted).vault() == vault
+
+    with brownie.reverts("ProxyFactory: deploy failed"):
+        proxyFactoryInitializable.deployMinimalDeterministic(strategyLogic, data, salt, {"from": strategist})
+
+
+def test_deploy_minimal_with_args(
+    proxyFactoryInitializable, strategyFactory, strategyImmutableArgsLogic, vault, strategist, gov, token, tokenWhale,
+    comp, idle, weth, idleReservoir, idleToken, referral, converter, web3
+):
+    strategy = strategyFactory(vault, immutableArgs=True)
+    assert len(web3.eth.get_code(strategy.address)) == 125
+    assert strategy.getWeth() == weth
+    assert strategy.idleReservoir() == idleReservoir
+    assert strategy.idleYieldToken() == idleToken
+    assert strategy.referral() == referral
+
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * (10 ** token.decimals()), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+    assert idleToken.balanceOf(strategy) > 0
+
+    # init must match the args in the code
+    data = initData(
+        strategyImmutableArgsLogic, vault, strategist, comp, idle, weth, idleReservoir, idleToken, strategist, converter
+    )
+    args = immutableArgsOf(weth, idleReservoir, idleToken, referral)
+    with brownie.reverts("Immutable args mismatch"):
+        proxyFactoryInitializable.deployMinimalWithArgs(strategyImmutableArgsLogic, args, data, {"from": strategist})
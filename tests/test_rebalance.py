@@ -0,0 +1,118 @@
+import brownie
+import pytest
+
+pytestmark = pytest.mark.mocks
+
+
+@pytest.fixture
+def otherIdleToken(MockIdleToken, accounts, token, comp, idle):
+    # A second Idle product of the same want, e.g. a Risk-Adjusted tranche
+    otherIdleToken = accounts[0].deploy(MockIdleToken, token, "IdleToken RA", "idleRA")
+    otherIdleToken.setGovTokens([comp, idle])
+    yield otherIdleToken
+
+
+def deposit(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken):
+    mockIdleToken.setAvgAPR(3 * 10 ** 18)
+    otherIdleToken.setAvgAPR(5 * 10 ** 18)
+    strategy.setExtraIdleTokens([otherIdleToken], {"from": gov})
+
+    amount = 1000 * (10 ** token.decimals())
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(amount, {"from": tokenWhale})
+
+    # Nothing to move yet, new want goes to the best APR
+    strategy.harvest({"from": gov})
+    assert strategy.activeIdleTokenIndex() == 1
+    assert mockIdleToken.balanceOf(strategy) == 0
+    assert otherIdleToken.balanceOf(strategy) > 0
+    assert strategy.estimatedTotalAssets() + 1 >= amount
+
+
+def test_rebalance(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken, chain):
+    deposit(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken)
+    totalAssets = strategy.estimatedTotalAssets()
+
+    # Free moves: any APR gain pays for them
+    strategy.setRebalanceParams(7 * 86400, 0, {"from": gov})
+    mockIdleToken.setAvgAPR(10 * 10 ** 18)
+    chain.sleep(3600)
+    strategy.harvest({"from": gov})
+    assert strategy.activeIdleTokenIndex() == 0
+    assert otherIdleToken.balanceOf(strategy) == 0
+    assert mockIdleToken.balanceOf(strategy) > 0
+    assert strategy.estimatedTotalAssets() + 1 >= totalAssets
+
+    # 0.01% more APR doesn't pay for a redeem and a mint at 100 gwei
+    strategy.setRebalanceParams(7 * 86400, 500_000, {"from": gov})
+    otherIdleToken.setAvgAPR(10 * 10 ** 18 + 10 ** 16)
+    chain.sleep(3600)
+    strategy.harvest({"from": gov, "gas_price": 100 * 10 ** 9})
+    assert strategy.activeIdleTokenIndex() == 0
+    assert otherIdleToken.balanceOf(strategy) == 0
+
+
+def test_extra_idle_tokens_withdraw_and_migration(
+    vault, strategy, strategyFactory, token, tokenWhale, gov, otherIdleToken, mockIdleToken
+):
+    deposit(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken)
+
+    # idleYieldToken is empty, the withdrawal is redeemed from the extra IdleToken
+    balance = token.balanceOf(tokenWhale)
+    vault.withdraw(vault.balanceOf(tokenWhale) // 2, {"from": tokenWhale})
+    assert token.balanceOf(tokenWhale) > balance
+    assert vault.strategies(strategy).dict()["totalLoss"] <= 1
+
+    totalAssets = strategy.estimatedTotalAssets()
+    strategyNext = strategyFactory(vault)
+    vault.migrateStrategy(strategy, strategyNext, {"from": gov})
+    assert otherIdleToken.balanceOf(strategy) == 0
+    assert strategyNext.estimatedTotalAssets() + 1 >= totalAssets
+
+
+def test_tend_claims_extra_gov_tokens(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken, idle, chain):
+    deposit(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken)
+    otherIdleToken.setGovTokenRate(idle, 10 ** 14)
+    chain.mine(100)
+
+    idleTokens = otherIdleToken.balanceOf(strategy)
+    strategy.tend({"from": gov})
+    assert otherIdleToken.getGovTokensAmounts(strategy) == [0, 0]
+    assert idle.balanceOf(strategy) == 0
+    # Compounded into the active IdleToken
+    assert otherIdleToken.balanceOf(strategy) > idleTokens
+
+
+def test_extra_idle_tokens_protected_and_gov_value(
+    vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken, idle, chain
+):
+    deposit(vault, strategy, token, tokenWhale, gov, otherIdleToken, mockIdleToken)
+
+    with brownie.reverts("!protected"):
+        strategy.sweep(otherIdleToken, {"from": gov})
+
+    # Only the extra IdleToken is held, its accrued gov tokens are counted
+    assert strategy.estimatedGovTokensValue() == 0
+    otherIdleToken.setGovTokenRate(idle, 10 ** 14)
+    chain.mine(100)
+    assert strategy.estimatedGovTokensValue() > 0
+
+
+def test_set_extra_idle_tokens(strategy, gov, strategist, otherIdleToken, idleToken):
+    with brownie.reverts("!authorized"):
+        strategy.setExtraIdleTokens([otherIdleToken], {"from": strategist})
+    with brownie.reverts("Invalid IdleToken"):
+        strategy.setExtraIdleTokens([idleToken], {"from": gov})
+    with brownie.reverts("Invalid IdleToken"):
+        strategy.setExtraIdleTokens([otherIdleToken, otherIdleToken], {"from": gov})
+    with brownie.reverts("IdleTokens too long"):
+        strategy.setExtraIdleTokens([otherIdleToken] * 4, {"from": gov})
+
+    strategy.setExtraIdleTokens([otherIdleToken], {"from": gov})
+    assert strategy.getExtraIdleTokens() == [otherIdleToken]
+    assert strategy.extraVirtualPrices(otherIdleToken) == otherIdleToken.tokenPrice()
+
+    strategy.setExtraIdleTokens([], {"from": gov})
+    assert strategy.extraVirtualPrices(otherIdleToken) == 0
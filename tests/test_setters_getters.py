@@ -76,6 +76,15 @@ def test_setters(vault, gov, strategy, token, tokenWhale, strategist, converter,
     strategy.setRedeemThreshold(3, {"from": gov})
     assert strategy.redeemThreshold() == 3
 
+    strategy.setRateStaleness(3600, {"from": guardian})
+    assert strategy.rateStaleness() == 3600
+
+    strategy.setBufferRatio(500, {"from": guardian})
+    assert strategy.bufferRatio() == 500
+
+    strategy.setMinDeployAmount(10 ** decimals, {"from": gov})
+    assert strategy.minDeployAmount() == 10 ** decimals
+
     govTokens = [token.address]
     strategy.setGovTokens(govTokens, {"from": gov})
     assert strategy.getGovTokens()[0] == govTokens[0]
@@ -104,6 +113,18 @@ def test_setters(vault, gov, strategy, token, tokenWhale, strategist, converter,
     with brownie.reverts("!authorized"):
         strategy.setRedeemThreshold(4, {"from": strategist})
 
+    with brownie.reverts("!authorized"):
+        strategy.setRateStaleness(0, {"from": strategist})
+
+    with brownie.reverts("!authorized"):
+        strategy.setBufferRatio(0, {"from": strategist})
+
+    with brownie.reverts("!authorized"):
+        strategy.setMinDeployAmount(0, {"from": guardian})
+
+    with brownie.reverts("!authorized"):
+        strategy.forceDeploy({"from": guardian})
+
     with brownie.reverts("!authorized"):
         strategy.setGovTokens(govTokens, {"from": guardian})
 
@@ -3,6 +3,9 @@ import brownie
 from brownie import Wei
 from brownie import config
 
+# Swaps against the real Balancer/Uniswap pools and IDLE whale
+pytestmark = pytest.mark.mainnet
+
 
 def test_converter_balancer_weth(converter, accounts, idle, weth):
     user = accounts[0]
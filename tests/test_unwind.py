@@ -0,0 +1,75 @@
+import brownie
+
+
+def setup(vault, strategy, token, tokenWhale, gov):
+    decimals = token.decimals()
+    token.approve(vault, 2 ** 256 - 1, {"from": tokenWhale})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(100 * (10 ** decimals), {"from": tokenWhale})
+    strategy.harvest({"from": gov})
+
+
+def test_unwind_migration(gov, strategyFactory, vault, token, tokenWhale, idleToken, keeper, chain):
+    strategyOld = strategyFactory(vault)
+    setup(vault, strategyOld, token, tokenWhale, gov)
+
+    idleTokenBalance = idleToken.balanceOf(strategyOld)
+    strategyOld.setUnwindChunk(idleTokenBalance // 3 + 1, {"from": gov})
+    estimatedTotalAssets = strategyOld.estimatedTotalAssets()
+
+    strategyNext = strategyFactory(vault)
+    with brownie.reverts("unwind not complete"):
+        vault.migrateStrategy(strategyOld, strategyNext, {"from": gov})
+
+    tx = strategyOld.unwind({"from": keeper})
+    assert tx.events["Unwound"]["redeemed"] == idleTokenBalance // 3 + 1
+    assert strategyOld.unwinding()
+
+    # Redeemed want isn't minted back in between chunks
+    chain.sleep(10)
+    strategyOld.harvest({"from": gov})
+    assert idleToken.balanceOf(strategyOld) == tx.events["Unwound"]["remaining"]
+
+    strategyOld.unwind({"from": keeper})
+    assert idleToken.balanceOf(strategyOld) <= strategyOld.unwindChunk()
+
+    # The last chunk is redeemed by the migration itself
+    vault.migrateStrategy(strategyOld, strategyNext, {"from": gov})
+    assert idleToken.balanceOf(strategyOld) == 0
+    assert strategyNext.estimatedTotalAssets() + 2 >= estimatedTotalAssets
+
+
+def test_unwind_emergency_exit(gov, strategy, vault, token, tokenWhale, idleToken, keeper):
+    setup(vault, strategy, token, tokenWhale, gov)
+
+    strategy.setUnwindChunk(idleToken.balanceOf(strategy) // 2 + 1, {"from": gov})
+    strategy.setEmergencyExit({"from": gov})
+
+    # A partial redeem would be reported as a loss
+    with brownie.reverts("unwind not complete"):
+        strategy.harvest({"from": gov})
+
+    strategy.unwind({"from": keeper})
+    strategy.harvest({"from": gov})
+
+    assert idleToken.balanceOf(strategy) == 0
+    assert token.balanceOf(strategy) == 0
+    assert vault.strategies(strategy).dict()["totalLoss"] <= 2
+
+
+def test_unwind_auth(strategy, keeper, strategist, accounts, gov):
+    with brownie.reverts("unwindChunk not set"):
+        strategy.unwind({"from": keeper})
+
+    strategy.setUnwindChunk(1, {"from": gov})
+    with brownie.reverts("!authorized"):
+        strategy.unwind({"from": accounts[9]})
+    with brownie.reverts("!authorized"):
+        strategy.setUnwindChunk(1, {"from": strategist})
+
+    strategy.unwind({"from": keeper})
+    with brownie.reverts("Unwinding"):
+        strategy.forceDeploy({"from": keeper})
+    strategy.stopUnwind({"from": gov})
+    assert not strategy.unwinding()